@@ -1,11 +1,8 @@
-from dotenv import load_dotenv
-import os 
 from agents import Agent, OpenAIChatCompletionsModel,AsyncOpenAI, Runner, set_tracing_disabled
 import asyncio
+from config import CFG
 
-load_dotenv()
-
-api_key = os.getenv("OPEN_ROUTER_API_KEY")
+api_key = CFG.open_router_api_key
 model = "deepseek/deepseek-chat-v3-0324:free"
 base_url = "https://openrouter.ai/api/v1"
 
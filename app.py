@@ -1,49 +1,49 @@
-from agents import Agent, AsyncOpenAI, OpenAIChatCompletionsModel, RunConfig, Runner, function_tool
-import os
-from dotenv import load_dotenv, find_dotenv
+from agents import Agent, Runner, function_tool
+import logging
+import re
+from collections import deque
 import chainlit as cl
-import requests
+from openai.types.responses import ResponseTextDeltaEvent
+import aiohttp
+import orjson
+from config import CFG
+from gemini import config
 
-load_dotenv(find_dotenv())
-
-# API Keys
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-WEATHER_API_KEY = os.getenv("WEATHER_API_KEY")
+logger = logging.getLogger(__name__)
 
 # Check for API keys
-if not GEMINI_API_KEY or not WEATHER_API_KEY:
-    print("Error: Required API keys not found in environment variables.")
+if not CFG.gemini_api_key or not CFG.weather_api_key:
+    logger.error("Required API keys not found in environment variables.")
 
-# Provider and Model setup
-provider = AsyncOpenAI(
-    api_key=GEMINI_API_KEY,
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-)
+# Upstream endpoint and the query parameters that never change between calls
+WEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+WEATHER_PARAMS = {"appid": CFG.weather_api_key, "units": "metric"}
 
-model = OpenAIChatCompletionsModel(
-    model="gemini-2.0-flash",
-    openai_client=provider
-)
+# Shared HTTP session for the tools, created lazily on the running event loop
+_http: aiohttp.ClientSession | None = None
 
-config = RunConfig(
-    model=model,
-    model_provider=provider,
-    tracing_disabled=True
-)
+async def _get_http():
+    global _http
+    if _http is None or _http.closed:
+        _http = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=10),
+            connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300)
+        )
+    return _http
 
 # Weather tool
 @function_tool("weather")
-def get_weather(city: str):
-    url = f"https://api.openweathermap.org/data/2.5/weather?q={city}&appid={WEATHER_API_KEY}&units=metric"
-    response = requests.get(url)
-    
-    if response.status_code == 200:
-        data = response.json()
-        weather = data['weather'][0]['description']
-        temp = data['main']['temp']
-        return f"Weather in {city}: {weather}, Temperature: {temp}°C"
-    else:
-        return f"Failed to get weather for {city}. Status code: {response.status_code}"
+async def get_weather(city: str):
+    # Passing the city as a parameter lets aiohttp escape names like "São Paulo"
+    params = {**WEATHER_PARAMS, "q": city}
+    async with (await _get_http()).get(WEATHER_URL, params=params) as response:
+        if response.status == 200:
+            data = orjson.loads(await response.read())
+            weather = data['weather'][0]['description']
+            temp = data['main']['temp']
+            return f"Weather in {city}: {weather}, Temperature: {temp}°C"
+        else:
+            return f"Failed to get weather for {city}. Status code: {response.status}"
 
 # Define agents
 general_agent = Agent(
@@ -59,18 +59,37 @@ weather_agent = Agent(
 
 translator_agent = Agent(
     name="Translator Agent",
-    instructions="""You are a professional multilingual translator.
-    Your responsibilities:
-    1. Detect the source language of the user's input automatically.
-    2. Translate the text into the requested target language.
-    3. Use simple, natural language and maintain proper grammar.
-    4. If the target language uses a different script, include both the translation and pronunciation.
-    For non-translation queries, suggest using the general assistant."""
+    instructions="Translate to the requested language, auto-detect the source, and include pronunciation for non-Latin scripts. For non-translation queries, suggest using the general assistant."
 )
 
+# Conversation history limits: the last RECENT_MESSAGES are always sent,
+# older messages only when they carry details worth keeping (addresses,
+# numbers, names) and fit in CONTEXT_BUDGET characters
+HISTORY_MAXLEN = 40
+RECENT_MESSAGES = 20
+CONTEXT_BUDGET = 4096
+LOAD_BEARING = re.compile(r"@|\d|[A-Z][a-z]+")
+
+def build_context(history):
+    messages = list(history)
+    if len(messages) <= RECENT_MESSAGES:
+        return messages
+    older, recent = messages[:-RECENT_MESSAGES], messages[-RECENT_MESSAGES:]
+    
+    kept = []
+    budget = CONTEXT_BUDGET
+    for msg in reversed(older):
+        size = len(msg["content"])
+        if size <= budget and LOAD_BEARING.search(msg["content"]):
+            kept.append(msg)
+            budget -= size
+    kept.reverse()
+    
+    return kept + recent
+
 @cl.on_chat_start
 async def chat_start():
-    cl.user_session.set("history", [])
+    cl.user_session.set("history", deque(maxlen=HISTORY_MAXLEN))
     welcome_msg = """Welcome! I'm your multi-agent assistant. You can:
     1. Ask general questions (just ask normally)
     2. Check weather (start with 'weather in [city]')
@@ -78,6 +97,11 @@ async def chat_start():
     How can I help you today? 😊"""
     await cl.Message(content=welcome_msg).send()
 
+@cl.on_app_shutdown
+async def close_http():
+    if _http is not None and not _http.closed:
+        await _http.close()
+
 @cl.on_message
 async def handle_message(message: cl.Message):
     try:
@@ -92,22 +116,27 @@ async def handle_message(message: cl.Message):
         else:
             current_agent = general_agent
             
-        # Format messages for history
+        # History entries are stored in the canonical message format
         history.append({"role": "user", "content": message.content})
-        formatted_messages = [{"role": msg["role"].lower(), "content": msg["content"]} for msg in history]
+        formatted_messages = build_context(history)
+        
+        # Stream the response from selected agent
+        msg = cl.Message(content="")
+        await msg.send()
         
-        # Get response from selected agent
-        result = await Runner.run(
+        result = Runner.run_streamed(
             starting_agent=current_agent,
             input=formatted_messages,
             run_config=config
         )
+        async for event in result.stream_events():
+            if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+                await msg.stream_token(event.data.delta)
+        await msg.update()
         
-        # Update history and send response
+        # Update history (the session holds the deque itself, so no need to set it again)
         history.append({"role": "assistant", "content": result.final_output})
-        cl.user_session.set("history", history)
-        await cl.Message(content=result.final_output).send()
         
     except Exception as e:
-        print(f"An error occurred: {e}")
+        logger.exception("An error occurred while handling a message")
         await cl.Message(content=f"Sorry, an error occurred: {e}").send()
\ No newline at end of file
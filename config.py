@@ -0,0 +1,41 @@
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load the .env file next to this module once per process (no directory walk);
+# variables already set in the environment take precedence
+load_dotenv(Path(__file__).parent / ".env", override=False)
+
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    """API keys and settings read from the environment once at import; modules use CFG."""
+    gemini_api_key: str | None
+    weather_api_key: str | None
+    news_api_key: str | None
+    sendgrid_api_key: str | None
+    email_address: str | None
+    email_password: str | None
+    coindesk_api_key: str | None
+    spoonacular_api_key: str | None
+    openroute_api_key: str | None
+    open_router_api_key: str | None
+    smtp_server: str
+    smtp_port: int
+
+
+CFG = Config(
+    gemini_api_key=os.getenv("GEMINI_API_KEY"),
+    weather_api_key=os.getenv("WEATHER_API_KEY"),
+    news_api_key=os.getenv("NEWS_API_KEY"),
+    sendgrid_api_key=os.getenv("SENDGRID_API_KEY"),
+    email_address=os.getenv("EMAIL_ADDRESS"),
+    email_password=os.getenv("EMAIL_PASSWORD"),
+    coindesk_api_key=os.getenv("COINDESK_API_KEY"),
+    spoonacular_api_key=os.getenv("SPOONACULAR_API_KEY"),
+    openroute_api_key=os.getenv("OPENROUTE_API_KEY"),
+    open_router_api_key=os.getenv("OPEN_ROUTER_API_KEY"),
+    smtp_server=os.getenv("SMTP_SERVER", "smtp.gmail.com"),
+    smtp_port=int(os.getenv("SMTP_PORT", "587")),
+)
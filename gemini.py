@@ -0,0 +1,28 @@
+import httpx
+from agents import AsyncOpenAI, OpenAIChatCompletionsModel, RunConfig
+from openai import DefaultAsyncHttpxClient
+from config import CFG
+
+# Provider and Model setup, shared by every agent so all model calls reuse one
+# HTTP/2 connection pool to the Gemini endpoint
+provider = AsyncOpenAI(
+    api_key=CFG.gemini_api_key,
+    base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
+    max_retries=2,
+    timeout=30,
+    http_client=DefaultAsyncHttpxClient(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=32)
+    )
+)
+
+model = OpenAIChatCompletionsModel(
+    model="gemini-2.0-flash",
+    openai_client=provider
+)
+
+config = RunConfig(
+    model=model,
+    model_provider=provider,
+    tracing_disabled=True
+)
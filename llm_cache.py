@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+# Small sentence-embedding model; fastembed runs it on ONNX Runtime, so no torch is needed
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+def _embed_sync(text: str):
+    global _embedder
+    with _embedder_lock:
+        if _embedder is None:
+            from fastembed import TextEmbedding
+            _embedder = TextEmbedding(model_name=EMBEDDING_MODEL)
+        vector = next(iter(_embedder.embed([text])))
+
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+async def embed(text: str):
+    """
+    Embeds text into a unit-length float32 vector without blocking the event loop.
+
+    Args:
+        text: The text to embed.
+
+    Returns:
+        A normalized numpy vector, so a dot product between two embeddings is their cosine similarity.
+    """
+    return await asyncio.to_thread(_embed_sync, text)
+
+
+class SemanticCache:
+    """
+    In-memory cache of LLM responses, looked up by embedding similarity instead of exact text.
+
+    Embeddings live in one preallocated float32 matrix, so a lookup is a single
+    matrix-vector product. Once full, the oldest entries are overwritten, and entries
+    older than ttl seconds are never returned.
+    """
+
+    def __init__(self, threshold: float = 0.9, max_entries: int = 10_000, ttl: float = 3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._matrix = None
+        self._expires = np.zeros(max_entries, dtype=np.float64)
+        self._responses: list[str | None] = [None] * max_entries
+        self._size = 0
+        self._next = 0
+
+    def search(self, embedding):
+        """
+        Returns the cached response closest to the embedding, or None if nothing is similar enough.
+        """
+        if self._size == 0:
+            return None
+
+        scores = self._matrix[:self._size] @ embedding
+        scores[self._expires[:self._size] <= time.monotonic()] = -1.0
+        best = int(np.argmax(scores))
+        if scores[best] >= self.threshold:
+            return self._responses[best]
+        return None
+
+    def add(self, embedding, response: str):
+        """
+        Stores a response under the embedding of the prompt that produced it.
+        """
+        if self._matrix is None:
+            self._matrix = np.zeros((self.max_entries, embedding.shape[0]), dtype=np.float32)
+
+        self._matrix[self._next] = embedding
+        self._responses[self._next] = response
+        self._expires[self._next] = time.monotonic() + self.ttl
+        self._next = (self._next + 1) % self.max_entries
+        self._size = min(self._size + 1, self.max_entries)
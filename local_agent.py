@@ -1,49 +1,31 @@
 # ─── Imports ────────────────────────────────────────────────────────────────
-from agents import Agent, AsyncOpenAI, OpenAIChatCompletionsModel, RunConfig, Runner, function_tool
+from agents import Agent, Runner, function_tool
 import chainlit as cl
-import os
-from dotenv import load_dotenv, find_dotenv
 
-# ─── Load Environment Variables ─────────────────────────────────────────────
-load_dotenv(find_dotenv())
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# ─── Model Setup ────────────────────────────────────────────────────────────
+from gemini import config
 
 # ─── Math Tools ─────────────────────────────────────────────────────────────
 
 @function_tool("add")
-def add(a: float, b: float):
+async def add(a: float, b: float):
     print("adding")
     return f"The sum of {a} and {b} is {a + b}"
 
 @function_tool("subtract")
-def subtract(a: float, b: float):
+async def subtract(a: float, b: float):
     return f"The difference between {a} and {b} is {a - b}"
 
 @function_tool("multiply")
-def multiply(a: float, b: float):
+async def multiply(a: float, b: float):
     return f"The product of {a} and {b} is {a * b}"
 
 @function_tool("divide")
-def divide(a: float, b: float):
+async def divide(a: float, b: float):
     if b == 0:
         return "Cannot divide by zero!"
     return f"The result of dividing {a} by {b} is {a / b}"
 
-# ─── Model Setup ────────────────────────────────────────────────────────────
-
-provider = AsyncOpenAI(api_key=GEMINI_API_KEY,base_url="https://generativelanguage.googleapis.com/v1beta/openai/")
-
-model = OpenAIChatCompletionsModel(
-    model="gemini-2.0-flash",
-    openai_client=provider
-)
-
-config = RunConfig(
-    model=model,
-    model_provider=provider,
-    tracing_disabled=True
-)
-
 # ─── Math Agent ─────────────────────────────────────────────────────────────
 
 math_agent = Agent(
@@ -1,167 +1,208 @@
-from agents import Agent, AsyncOpenAI, OpenAIChatCompletionsModel, RunConfig, Runner, function_tool
-import os
-from dotenv import load_dotenv, find_dotenv
+from agents import Agent, Runner, ToolCallItem, function_tool
+import logging
+import re
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
 import chainlit as cl
-import requests
+from openai.types.responses import ResponseTextDeltaEvent
+import aiohttp
+import orjson
+from cachetools import TTLCache
+from llm_cache import SemanticCache, embed
 from deep_translator import GoogleTranslator
+from config import CFG
+from gemini import config
 
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, Email, To, PlainTextContent
+logger = logging.getLogger(__name__)
 
+SENDGRID_SEND_URL = "https://api.sendgrid.com/v3/mail/send"
 
-load_dotenv(find_dotenv())
+# Upstream endpoints and the query parameters that never change between calls
+WEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+WEATHER_PARAMS = {"appid": CFG.weather_api_key, "units": "metric"}
+NEWS_URL = "https://newsdata.io/api/1/latest"
+NEWS_PARAMS = {"apikey": CFG.news_api_key, "language": "en"}
 
-# API Keys and Configuration
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-WEATHER_API_KEY = os.getenv("WEATHER_API_KEY")
-NEWS_API_KEY = os.getenv("NEWS_API_KEY")
-SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
+# Shared HTTP session for the tools, created lazily on the running event loop
+_http: aiohttp.ClientSession | None = None
 
-# Provider and Model setup
-provider = AsyncOpenAI(
-    api_key=GEMINI_API_KEY,
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-)
+async def _get_http():
+    global _http
+    if _http is None or _http.closed:
+        _http = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=10),
+            connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300)
+        )
+    return _http
 
-model = OpenAIChatCompletionsModel(
-    model="gemini-2.0-flash",
-    openai_client=provider
-)
+# Short-lived caches for upstream API responses; the per-key locks make
+# concurrent identical requests share a single upstream call
+_weather_cache = TTLCache(maxsize=1024, ttl=300)
+_news_cache = TTLCache(maxsize=512, ttl=120)
+_weather_locks: dict = {}
+_news_locks: dict = {}
 
-config = RunConfig(
-    model=model,
-    model_provider=provider,
-    tracing_disabled=True
-)
+@asynccontextmanager
+async def _key_lock(locks, key):
+    # Each entry is [lock, users]; it is removed when its last user leaves,
+    # so the dict only holds keys with a request in flight
+    entry = locks.get(key)
+    if entry is None:
+        entry = locks[key] = [asyncio.Lock(), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del locks[key]
 
 # Tool definitions
 @function_tool("weather")
-def get_weather(city: str):
+async def get_weather(city: str):
     try:
-        if not WEATHER_API_KEY:
+        if not CFG.weather_api_key:
             return "Weather service is not configured. Please check the WEATHER_API_KEY environment variable."
             
-        url = f"https://api.openweathermap.org/data/2.5/weather?q={city}&appid={WEATHER_API_KEY}&units=metric"
-        print(f"Making weather API request for {city}")  # Debug log
+        key = city.strip().lower()
+        if key in _weather_cache:
+            return _weather_cache[key]
         
-        response = requests.get(url)
-        print(f"Weather API response status: {response.status_code}")  # Debug log
-        
-        if response.status_code == 200:
-            data = response.json()
-            weather = data['weather'][0]['description']
-            temp = data['main']['temp']
-            humidity = data['main']['humidity']
-            wind_speed = data['wind']['speed']
+        async with _key_lock(_weather_locks, key):
+            if key in _weather_cache:
+                return _weather_cache[key]
+            
+            logger.debug("Making weather API request for %s", city)
             
-            return f"""Weather in {city}:
+            # Passing the city as a parameter lets aiohttp escape names like "São Paulo"
+            params = {**WEATHER_PARAMS, "q": city}
+            async with (await _get_http()).get(WEATHER_URL, params=params) as response:
+                logger.debug("Weather API response status: %s", response.status)
+                
+                if response.status == 200:
+                    data = orjson.loads(await response.read())
+                    weather = data['weather'][0]['description']
+                    temp = data['main']['temp']
+                    humidity = data['main']['humidity']
+                    wind_speed = data['wind']['speed']
+                    
+                    _weather_cache[key] = f"""Weather in {city}:
 • Temperature: {temp}°C
 • Conditions: {weather}
 • Humidity: {humidity}%
 • Wind Speed: {wind_speed} m/s"""
-        elif response.status_code == 401:
-            return "Weather service authentication failed. Please check the API key."
-        elif response.status_code == 404:
-            return f"City '{city}' not found. Please check the spelling and try again."
-        else:
-            return f"Failed to get weather for {city}. Status code: {response.status_code}"
+                    return _weather_cache[key]
+                elif response.status == 401:
+                    return "Weather service authentication failed. Please check the API key."
+                elif response.status == 404:
+                    return f"City '{city}' not found. Please check the spelling and try again."
+                else:
+                    return f"Failed to get weather for {city}. Status code: {response.status}"
             
     except Exception as e:
-        print(f"Weather API error: {str(e)}")  # Debug log
+        logger.warning("Weather API error: %s", e)
         return f"An error occurred while fetching weather data: {str(e)}"
 
 @function_tool("send_email")
 async def send_email(to_email: str, subject: str, message: str):
     try:
-        # Debug logging for environment variables
-        print("Checking environment variables...")
-        print(f"SENDGRID_API_KEY exists: {bool(SENDGRID_API_KEY)}")
-        print(f"EMAIL_ADDRESS exists: {bool(os.getenv('EMAIL_ADDRESS'))}")
-        
-        if not SENDGRID_API_KEY:
+        if not CFG.sendgrid_api_key:
             return "SendGrid API key is not configured. Please set the SENDGRID_API_KEY environment variable."
         
-        sender_email = os.getenv("EMAIL_ADDRESS")
-        if not sender_email:
+        if not CFG.email_address:
             return "Sender email address is not configured. Please set the EMAIL_ADDRESS environment variable."
-            
-        print(f"Using sender email: {sender_email}")
-        print(f"Sending to: {to_email}")
-        print(f"Subject: {subject}")
         
-        # Create a Mail object
-        mail = Mail(
-            from_email=Email(sender_email),
-            to_emails=To(to_email),
-            subject=subject,
-            plain_text_content=PlainTextContent(message)
-        )
-        
-        # Create a SendGridAPIClient
-        sg = SendGridAPIClient(SENDGRID_API_KEY)
-        
-        print("Attempting to send email using SendGrid...")
-        # Send the email
-        response = sg.send(mail)
+        # Build the SendGrid v3 mail payload
+        payload = {
+            "personalizations": [{"to": [{"email": to_email}]}],
+            "from": {"email": CFG.email_address},
+            "subject": subject,
+            "content": [{"type": "text/plain", "value": message}]
+        }
         
-        print(f"SendGrid response status code: {response.status_code}")
-        print(f"SendGrid response body: {response.body}")
-        print(f"SendGrid response headers: {response.headers}")
+        # Send the email through the SendGrid REST API on the shared session
+        async with (await _get_http()).post(
+            SENDGRID_SEND_URL,
+            headers={"Authorization": f"Bearer {CFG.sendgrid_api_key}"},
+            json=payload
+        ) as response:
+            logger.debug("SendGrid response status code: %s", response.status)
 
-        if response.status_code >= 200 and response.status_code < 300:
-            return f"Email sent successfully to {to_email} via SendGrid."
-        else:
-            error_message = f"Failed to send email via SendGrid. Status code: {response.status_code}"
-            if response.status_code == 403:
-                error_message += "\nThis might be due to:\n1. Invalid API key\n2. Unverified sender email\n3. Insufficient API key permissions"
-            return error_message
+            if response.status >= 200 and response.status < 300:
+                return f"Email sent successfully to {to_email} via SendGrid."
+            else:
+                error_message = f"Failed to send email via SendGrid. Status code: {response.status}"
+                if response.status == 403:
+                    error_message += "\nThis might be due to:\n1. Invalid API key\n2. Unverified sender email\n3. Insufficient API key permissions"
+                return error_message
 
     except Exception as e:
         error_msg = str(e)
-        print(f"Detailed error: {error_msg}")
-        if "403" in error_msg:
-            return "SendGrid authentication failed. Please check:\n1. Your SendGrid API key is valid\n2. Your sender email is verified in SendGrid\n3. Your API key has the necessary permissions"
+        logger.warning("SendGrid error: %s", error_msg)
         return f"Failed to send email via SendGrid: {error_msg}"
 
 @function_tool("news")
-def get_news(query: str = None, category: str = None):
-    base_url = "https://newsdata.io/api/1/latest"
-    params = {
-        "apikey": NEWS_API_KEY,
-        "language": "en"
-    }
-    
-    if query:
-        params["q"] = query
-    if category:
-        params["category"] = category
+async def get_news(query: str = None, category: str = None):
+    if not CFG.news_api_key:
+        return "News service is not configured. Please check the NEWS_API_KEY environment variable."
     
-    response = requests.get(base_url, params=params)
+    key = (query, category)
+    if key in _news_cache:
+        return _news_cache[key]
     
-    if response.status_code == 200:
-        data = response.json()
+    async with _key_lock(_news_locks, key):
+        if key in _news_cache:
+            return _news_cache[key]
+        
+        params = dict(NEWS_PARAMS)
+        if query:
+            params["q"] = query
+        if category:
+            params["category"] = category
+        
+        async with (await _get_http()).get(NEWS_URL, params=params) as response:
+            if response.status != 200:
+                return f"Failed to fetch news. Status code: {response.status}"
+            data = orjson.loads(await response.read())
+        
         articles = data.get("results", [])
         
         if not articles:
-            return "No news articles found for the given criteria."
-        
-        news_summary = "Here are the latest news articles:\n\n"
-        for i, article in enumerate(articles[:5], 1):
-            news_summary += f"{i}. {article['title']}\n"
-            news_summary += f"   Source: {article['source_id']}\n"
-            news_summary += f"   Description: {article.get('description', 'No description available')}\n"
-            news_summary += f"   Link: {article.get('link', 'No link available')}\n\n"
+            news_summary = "No news articles found for the given criteria."
+        else:
+            news_summary = "Here are the latest news articles:\n\n"
+            for i, article in enumerate(articles[:5], 1):
+                news_summary += f"{i}. {article['title']}\n"
+                news_summary += f"   Source: {article['source_id']}\n"
+                news_summary += f"   Description: {article.get('description', 'No description available')}\n"
+                news_summary += f"   Link: {article.get('link', 'No link available')}\n\n"
         
+        _news_cache[key] = news_summary
         return news_summary
-    else:
-        return f"Failed to fetch news. Status code: {response.status_code}"
+
+# One translator per target language. deep-translator keeps request state
+# on the instance, so each translator is only used under its own lock.
+_translators: dict[str, tuple[GoogleTranslator, threading.Lock]] = {}
+
+def _translate(text: str, target_language: str):
+    entry = _translators.get(target_language)
+    if entry is None:
+        entry = _translators.setdefault(
+            target_language,
+            (GoogleTranslator(source='auto', target=target_language), threading.Lock())
+        )
+    translator, lock = entry
+    with lock:
+        return translator.translate(text)
 
 @function_tool("translate_text")
 async def translate_text(text: str, target_language: str = "ur"):
     try:
-        # Use deep-translator which is more reliable
-        translator = GoogleTranslator(source='auto', target=target_language)
-        translation = translator.translate(text)
+        # Use deep-translator which is more reliable; it is blocking, so run it off the event loop
+        translation = await asyncio.to_thread(_translate, text, target_language)
         
         # Format the response
         response = f"Original: {text}\n"
@@ -169,9 +210,18 @@ async def translate_text(text: str, target_language: str = "ur"):
         
         return response
     except Exception as e:
-        print(f"Translation error: {str(e)}")  # Add debug logging
+        logger.warning("Translation error: %s", e)
         return f"Translation failed: {str(e)}"
 
+# Answers to general questions, reused for paraphrased versions of the same question
+response_cache = SemanticCache(threshold=0.9)
+
+# Routing keywords, matched against the whole words of a message
+WEATHER_KW = frozenset({"weather", "temperature", "forecast"})
+EMAIL_KW = frozenset({"email", "send", "mail"})
+TRANSLATE_KW = frozenset({"translate", "translation"})
+NEWS_KW = frozenset({"news", "latest", "headlines"})
+
 # Define specialized agents
 weather_agent = Agent(
     name="Weather Agent",
@@ -181,13 +231,7 @@ weather_agent = Agent(
 
 translator_agent = Agent(
     name="Translator Agent",
-    instructions="""You are a professional multilingual translator.
-    Your responsibilities:
-    1. Detect the source language automatically.
-    2. Translate text into the requested target language.
-    3. Use natural language and maintain proper grammar.
-    4. Include pronunciation for different scripts.
-    For non-translation queries, suggest using the general assistant.""",
+    instructions="Translate to the requested language, auto-detect the source, and include pronunciation for non-Latin scripts. For non-translation queries, suggest using the general assistant.",
     tools=[translate_text]
 )
 
@@ -206,20 +250,47 @@ news_agent = Agent(
 # Main agent that handles all queries and delegates to specialized agents
 main_agent = Agent(
     name="Main Assistant",
-    instructions="""You are a helpful assistant that can answer general questions and coordinate with specialized agents.
-    When users ask about specific tasks:
-    - For weather queries (containing words like 'weather', 'temperature', 'forecast'), use the weather tool
-    - For email tasks (containing words like 'email', 'send', 'mail'), use the email tool
-    - For translation requests (containing words like 'translate', 'translation'), use the translate_text tool
-    - For news queries (containing words like 'news', 'latest', 'headlines'), use the news tool
-    For general knowledge questions, provide direct answers.
-    Always be helpful and informative.""",
+    instructions="You are a helpful assistant. Use the weather, send_email, news and translate_text tools for those tasks; answer general questions directly.",
     tools=[get_weather, send_email, get_news, translate_text]
 )
 
+# Agent that serves each routed query type; only its tools are sent to the model
+AGENTS = {
+    "Weather Agent": weather_agent,
+    "Email Agent": email_agent,
+    "Translator Agent": translator_agent,
+    "News Agent": news_agent,
+    "General Assistant": main_agent
+}
+
+# Conversation history limits: the last RECENT_MESSAGES are always sent,
+# older messages only when they carry details worth keeping (addresses,
+# numbers, names) and fit in CONTEXT_BUDGET characters
+HISTORY_MAXLEN = 40
+RECENT_MESSAGES = 20
+CONTEXT_BUDGET = 4096
+LOAD_BEARING = re.compile(r"@|\d|[A-Z][a-z]+")
+
+def build_context(history):
+    messages = list(history)
+    if len(messages) <= RECENT_MESSAGES:
+        return messages
+    older, recent = messages[:-RECENT_MESSAGES], messages[-RECENT_MESSAGES:]
+    
+    kept = []
+    budget = CONTEXT_BUDGET
+    for msg in reversed(older):
+        size = len(msg["content"])
+        if size <= budget and LOAD_BEARING.search(msg["content"]):
+            kept.append(msg)
+            budget -= size
+    kept.reverse()
+    
+    return kept + recent
+
 @cl.on_chat_start
 async def chat_start():
-    cl.user_session.set("history", [])
+    cl.user_session.set("history", deque(maxlen=HISTORY_MAXLEN))
     welcome_msg = """Welcome! I'm your multi-agent assistant. You can:
     1. Ask general questions (just ask normally)
     2. Check weather (ask about weather in any city)
@@ -229,57 +300,81 @@ async def chat_start():
     How can I help you today? 😊"""
     await cl.Message(content=welcome_msg).send()
 
+@cl.on_app_shutdown
+async def close_http():
+    if _http is not None and not _http.closed:
+        await _http.close()
+
 @cl.on_message
 async def handle_message(message: cl.Message):
     try:
         history = cl.user_session.get("history")
         
-        # Format messages for history
+        # History entries are stored in the canonical message format
         history.append({"role": "user", "content": message.content})
-        formatted_messages = [{"role": msg["role"].lower(), "content": msg["content"]} for msg in history]
+        formatted_messages = build_context(history)
         
         # Determine which agent should handle the query
-        user_input = message.content.lower()
+        tokens = set(re.findall(r"[a-z]+", message.content.lower()))
         agent_type = "General Assistant"
         
-        if any(word in user_input for word in ["weather", "temperature", "forecast"]):
+        if tokens & WEATHER_KW:
             agent_type = "Weather Agent"
-        elif any(word in user_input for word in ["email", "send", "mail"]):
+        elif tokens & EMAIL_KW:
             agent_type = "Email Agent"
-        elif any(word in user_input for word in ["translate", "translation"]):
+        elif tokens & TRANSLATE_KW:
             agent_type = "Translator Agent"
-        elif any(word in user_input for word in ["news", "latest", "headlines"]):
+        elif tokens & NEWS_KW:
             agent_type = "News Agent"
         
-        # Show which agent is analyzing
-        await cl.Message(
-            content=f"🤖 {agent_type} is analyzing your query...",
-            author=agent_type
-        ).send()
+        # A general question that opens the conversation does not depend on earlier
+        # turns, so a cached answer to a similar question can be reused
+        embedding = None
+        if agent_type == "General Assistant" and len(history) == 1:
+            # The cache is optional: if the embedding model can't be loaded, answer without it
+            try:
+                embedding = await embed(message.content)
+            except Exception:
+                logger.warning("Response cache unavailable, embedding failed", exc_info=True)
+            if embedding is not None:
+                cached = response_cache.search(embedding)
+                if cached is not None:
+                    history.append({"role": "assistant", "content": cached})
+                    await cl.Message(content=cached, author=agent_type).send()
+                    return
         
-        # Get response from main agent
-        result = await Runner.run(
-            starting_agent=main_agent,
+        # Show which agent is analyzing; the response then streams into the same message
+        msg = cl.Message(content=f"🤖 {agent_type} is analyzing your query...", author=agent_type)
+        await msg.send()
+        
+        result = Runner.run_streamed(
+            starting_agent=AGENTS[agent_type],
             input=formatted_messages,
             run_config=config
         )
+        placeholder = True
+        async for event in result.stream_events():
+            if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+                # The first token replaces the placeholder text, later ones are appended
+                await msg.stream_token(event.data.delta, is_sequence=placeholder)
+                placeholder = False
+        msg.content = result.final_output
+        await msg.update()
         
-        # Update history and send response
+        # Update history (the session holds the deque itself, so no need to set it again)
         history.append({"role": "assistant", "content": result.final_output})
-        cl.user_session.set("history", history)
-        
-        # Send the response with the agent's name
-        await cl.Message(
-            content=result.final_output,
-            author=agent_type
-        ).send()
+        # Only answers the model gave on its own are cached; anything built from a tool call
+        # (weather, news, ...) is live data or has a side effect (email) and must not be replayed
+        if embedding is not None and not any(isinstance(item, ToolCallItem) for item in result.new_items):
+            response_cache.add(embedding, result.final_output)
         
     except Exception as e:
-        print(f"An error occurred: {e}")
+        logger.exception("An error occurred while handling a message")
         await cl.Message(
             content=f"Sorry, an error occurred: {e}",
             author="System"
         ).send()
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
     cl.run()
\ No newline at end of file
@@ -1,78 +1,264 @@
 # --- Library Imports ---
 
 # Import necessary components from the agents SDK for creating agents and running them
-from agents import Agent, AsyncOpenAI, OpenAIChatCompletionsModel, RunConfig, Runner, function_tool
-
-# Import OS for interacting with the operating system (like accessing environment variables)
-import os
-# Import libraries to load environment variables from a .env file
-from dotenv import load_dotenv, find_dotenv
+from agents import Agent, Runner, ToolCallItem, function_tool
+
+# Import logging for diagnostics (lazy %-formatting, so disabled levels cost almost nothing)
+import logging
+# Import regular expressions for matching keywords in user input
+import re
+# Import deque for the bounded per-session conversation history
+from collections import deque
+# Import a read-only dict view for lookup tables that must not change at runtime
+from types import MappingProxyType
+# Import Path for locating data files next to this script
+from pathlib import Path
 
 # Import Chainlit library for creating the interactive chat interface
 import chainlit as cl
+# Import the streamed text-delta event type, used to forward the answer to Chainlit token by token
+from openai.types.responses import ResponseTextDeltaEvent
 
 # Import libraries for making HTTP requests (used by weather and news tools)
-import requests
-# Import libraries for sending emails via SMTP
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-# Import library for text translation
-from deep_translator import GoogleTranslator
-
-# Import libraries for location services
-from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
-
-# Import additional libraries for documentation analysis
-import requests
-import json
+import httpx
+from cachetools import LRUCache, TTLCache
+import diskcache
+# Import orjson for fast JSON parsing of API responses
+import orjson
+# Import retry with backoff and a circuit breaker for resilience against flaky upstream APIs
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+import pybreaker
+# Import Aho-Corasick automaton for matching every medication condition in a single pass over the query
+import ahocorasick
+# Import the semantic response cache (answers reused for paraphrased questions)
+from llm_cache import SemanticCache, embed
+# Import asyncio for running blocking library calls off the event loop
+import asyncio
+# Import libraries for sending emails via SMTP (aiosmtplib keeps the TLS handshake off the event loop)
+import aiosmtplib
+# Import functools for caching translator instances
+import functools
+# Import time for timestamping cached routes
 import time
+# Import threading for guarding translator instances used from worker threads
+import threading
 
+# Rarely used, heavier dependencies (email.mime, deep_translator, geopy) are imported inside the
+# tools that need them, so sessions that never send email, translate or route don't pay for them at startup
 
 
-# --- Load Environment Variables ---
 
-# Load environment variables from the .env file (this allows you to keep sensitive info outside the code)
-# find_dotenv() automatically searches for the .env file in the directory hierarchy
-load_dotenv(find_dotenv())
+logger = logging.getLogger(__name__)
 
 # --- API Keys and Configuration ---
 
-# Get API keys and sensitive information from environment variables
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY") # API key for accessing the Gemini model
-WEATHER_API_KEY = os.getenv("WEATHER_API_KEY") # API key for the weather service
-NEWS_API_KEY = os.getenv("NEWS_API_KEY") # API key for the news service
-EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS") # Your email address used as the sender
-EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD") # Your email app password (required for app login, not your main password)
-COINDESK_API_KEY = os.getenv("COINDESK_API_KEY") # API key for CoinDesk cryptocurrency data
-SPOONACULAR_API_KEY = os.getenv("SPOONACULAR_API_KEY")  # API key for recipe service
-OPENROUTE_API_KEY = os.getenv("OPENROUTE_API_KEY")  # API key for OpenRouteService
-
-# SMTP Configuration (for sending emails via a standard SMTP server like Gmail)
-SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com") # Get SMTP server address from env, default to Gmail
-SMTP_PORT = int(os.getenv("SMTP_PORT", "587")) # Get SMTP port from env, default to 587 (TLS)
+# API keys, email credentials and SMTP settings are loaded once from the .env file by config.py
+from config import CFG
+
+# --- Service Endpoints and Lookup Tables ---
+
+# Base URLs of the external APIs used by the tools; query parameters are passed separately
+# so httpx URL-encodes them (e.g. city names with spaces or accents like "São Paulo")
+WEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+COINGECKO_PRICE_URL = "https://api.coingecko.com/api/v3/simple/price"
+NEWS_URL = "https://newsdata.io/api/1/latest"
+RECIPE_URL = "https://api.spoonacular.com/recipes/complexSearch"
+QUOTES_URL = "https://zenquotes.io/api/quotes"
+OSRM_ROUTE_URL = "http://router.project-osrm.org/route/v1/driving/"
+
+# Fixed query parameters for each API; tools copy them and add the per-call fields
+_NEWS_PARAMS = MappingProxyType({
+    "apikey": CFG.news_api_key, # Include the API key
+    "language": "en" # Requesting news in English language
+})
+_RECIPE_PARAMS = MappingProxyType({
+    "apiKey": CFG.spoonacular_api_key,
+    "addRecipeInformation": True,
+    "number": 1,  # Get one recipe at a time
+    "instructionsRequired": True,
+    "fillIngredients": True
+})
+_QUOTES_PARAMS = MappingProxyType({
+    "count": 3  # Get 3 quotes at a time
+})
+_COINGECKO_PARAMS = MappingProxyType({ # The coin id is added per call
+    "vs_currencies": "usd,gbp,eur",
+    "include_24hr_change": "true"
+})
+
+# Map common symbols to their CoinGecko IDs
+CRYPTO_MAP = MappingProxyType({
+    "btc": "bitcoin",
+    "eth": "ethereum",
+    "sol": "solana",
+    "bitcoin": "bitcoin",
+    "ethereum": "ethereum",
+    "solana": "solana"
+})
 
 # --- AI Model Setup (Gemini) ---
 
-# Setup AsyncOpenAI client, configuring it to use the Gemini API endpoint
-provider = AsyncOpenAI(
-    api_key=GEMINI_API_KEY,
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/" # Google's API endpoint for Gemini via OpenAI SDK
-)
+# The Gemini provider, model and run configuration are shared with the other apps (see gemini.py),
+# so all model calls in the process go through one HTTP/2 connection pool
+from gemini import config
+
+# --- Shared HTTP Client ---
 
-# Configuration for the specific Gemini model we will use (using a flash model for speed/cost efficiency)
-model = OpenAIChatCompletionsModel(
-    model="gemini-2.0-flash", # Specifying the model name
-    openai_client=provider # Associating the model with our configured provider
+# One async HTTP client shared by all tools. Keep-alive pooling (and HTTP/2 multiplexing) lets repeated
+# calls to the same API reuse an open connection instead of paying a new TCP/TLS handshake each time.
+HTTP = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+    timeout=10.0
 )
 
-# Define the run configuration for how the model should be executed
-config = RunConfig(
-    model=model, # Specify the model to use for runs
-    model_provider=provider, # Specify the provider for the model
-    tracing_disabled=True # Set to False to see detailed model tracing (tool calls, reasoning) in the Chainlit UI
+# --- Response Caches ---
+
+# Parsed API responses are kept for a short time, keyed by the normalized tool arguments, so repeated
+# questions are answered without another network round trip. The raw JSON is cached rather than the
+# formatted text, so a change to a tool's output format never serves stale text.
+_weather_cache = TTLCache(maxsize=512, ttl=300) # Weather changes slowly: 5 minutes
+_news_cache = TTLCache(maxsize=256, ttl=120) # 2 minutes
+_crypto_cache = TTLCache(maxsize=256, ttl=60) # Prices move quickly: 1 minute
+_recipe_cache = TTLCache(maxsize=256, ttl=24 * 60 * 60) # Recipes are effectively static: 1 day
+_motivation_cache = TTLCache(maxsize=64, ttl=60) # 1 minute
+
+# Geocodes and driving routes barely change, so they are persisted on disk (SQLite-backed, JSON values) and survive
+# restarts and redeploys. Geocodes are keyed by the normalized location text, routes by endpoints snapped to a ~110 m grid.
+_GEO_CACHE = diskcache.Cache(str(Path(__file__).parent / ".geocache"), size_limit=50 * 2**20, disk=diskcache.JSONDisk)
+GEOCODE_TTL = 30 * 24 * 60 * 60 # 30 days
+_GEOCODE_INFLIGHT: dict[str, asyncio.Future] = {} # Geocode lookups in progress, shared by concurrent requests for the same key
+ROUTE_TTL = 7 * 24 * 60 * 60 # 7 days before a route is revalidated with OSRM
+ROUTE_STALE_TTL = 30 * 24 * 60 * 60 # Stale routes are kept (with their ETag) for revalidation up to 30 days
+
+# One circuit breaker per API host: after 5 consecutive failed calls (after retries) the host is
+# skipped for 30 seconds, so the agent gets an immediate error instead of waiting on a dead service
+_breakers: dict[str, pybreaker.CircuitBreaker] = {}
+
+def _breaker_for(url):
+    host = httpx.URL(url).host
+    breaker = _breakers.get(host)
+    if breaker is None:
+        # A cancelled call (the user stopped the run) says nothing about the host's health
+        breaker = _breakers[host] = pybreaker.CircuitBreaker(fail_max=5, reset_timeout=30, exclude=[asyncio.CancelledError])
+    return breaker
+
+# Transient failures (network errors, timeouts, 429 and 5xx responses) are retried with jittered exponential backoff
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential_jitter(initial=0.2, max=2),
+    retry=retry_if_exception_type(httpx.HTTPError),
+    reraise=True
 )
+async def _get_with_retry(url, params=None, headers=None):
+    response = await HTTP.get(url, params=params, headers=headers)
+    if response.status_code == 429 or response.status_code >= 500:
+        response.raise_for_status()
+    return response
+
+async def _cached_get_json(cache, key, url, params=None):
+    """
+    Makes a GET request and returns its parsed JSON body, serving it from the cache while fresh.
+
+    Args:
+        cache: The TTLCache holding responses for this tool.
+        key: The normalized cache key for this request.
+        url: The URL to request.
+        params: Optional query parameters.
+
+    Returns:
+        A (status_code, data) tuple. Only successful (200) responses are cached; data is None otherwise.
+        If retries run out the status is the last error status (503 for network errors), and while the
+        host's circuit breaker is open it is 503.
+    """
+    if key in cache:
+        return 200, cache[key]
+
+    try:
+        with _breaker_for(url).calling():
+            response = await _get_with_retry(url, params)
+    except pybreaker.CircuitBreakerError as e:
+        # The call that trips the breaker raises CircuitBreakerError from its own failure: report that status
+        cause = e.__cause__ or e.__context__
+        if isinstance(cause, httpx.HTTPStatusError):
+            return cause.response.status_code, None
+        return 503, None # Service temporarily unavailable: don't touch the network
+    except httpx.HTTPStatusError as e:
+        return e.response.status_code, None
+    except httpx.HTTPError:
+        return 503, None
+
+    if response.status_code != 200:
+        return response.status_code, None
+
+    data = orjson.loads(response.content)
+    cache[key] = data
+    return 200, data
+
+class NewsLoader:
+    """
+    Coalesces news lookups that arrive within a short window into one dispatch.
+
+    NewsData.io has no batch endpoint, so the distinct queries collected in a window are
+    fetched concurrently, and identical queries share a single request.
+    """
+
+    def __init__(self, window: float = 0.01):
+        self.window = window # Seconds to wait for more lookups before dispatching
+        self._pending = {} # cache key -> (future, params)
+        self._timer = None
+        self._tasks = set() # Strong references to in-flight dispatches so they aren't garbage-collected
+
+    async def load(self, key, params):
+        """
+        Queues a news lookup and waits for the batch it ends up in.
+
+        Args:
+            key: The normalized cache key for this lookup.
+            params: The query parameters for the news API.
+
+        Returns:
+            A (status_code, data) tuple, as returned by _cached_get_json.
+        """
+        # Cached news is returned at once, without waiting for the batching window
+        data = _news_cache.get(key)
+        if data is not None:
+            return 200, data
+        loop = asyncio.get_running_loop()
+        if key in self._pending:
+            future = self._pending[key][0] # Same lookup already queued: share its result
+        else:
+            future = loop.create_future()
+            self._pending[key] = (future, params)
+        if self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        # The future is shared by every caller with this key, so one caller being cancelled must not cancel it for the rest
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        pending, self._pending, self._timer = self._pending, {}, None
+        task = asyncio.create_task(self._dispatch(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, pending):
+        results = await asyncio.gather(
+            *(_cached_get_json(_news_cache, key, NEWS_URL, params) for key, (_, params) in pending.items()),
+            return_exceptions=True
+        )
+        for (future, _), result in zip(pending.values(), results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+news_loader = NewsLoader()
+
+# Model answers to general questions keyed by the embedding of the question, so a paraphrase of a recent
+# question ("what is a black hole" / "explain black holes") is answered without calling Gemini
+response_cache = SemanticCache(threshold=0.92, ttl=3600)
 
 # --- Tools Definition (Functions for each agent's task) ---
 
@@ -81,7 +267,7 @@ config = RunConfig(
 
 # 1. Weather Tool: Fetches current weather data for a given city
 @function_tool("weather")
-def get_weather(city: str):
+async def get_weather(city: str):
     """
     Fetches current weather data for a specified city using the OpenWeatherMap API.
 
@@ -93,18 +279,17 @@ def get_weather(city: str):
         or an error message if the API request fails or the city is not found.
     """
     # Check if the OpenWeatherMap API key is available in environment variables
-    if not WEATHER_API_KEY:
+    if not CFG.weather_api_key:
         return "Weather service is not configured. Please check the WEATHER_API_KEY environment variable."
         
-    # Construct the API URL with the city and API key
-    url = f"https://api.openweathermap.org/data/2.5/weather?q={city}&appid={WEATHER_API_KEY}&units=metric" # units=metric for Celsius
+    # Construct the API request parameters with the city and API key
+    params = {"q": city, "appid": CFG.weather_api_key, "units": "metric"} # units=metric for Celsius
     
-    # Make the HTTP GET request to the weather API
-    response = requests.get(url)
+    # Make the HTTP GET request to the weather API (or reuse a recent response for the same city)
+    status, data = await _cached_get_json(_weather_cache, city.strip().lower(), WEATHER_URL, params)
     
     # Process the API response based on status code
-    if response.status_code == 200: # Success
-        data = response.json()
+    if status == 200: # Success
         # Extract relevant weather information from the JSON response
         weather = data['weather'][0]['description']
         temp = data['main']['temp']
@@ -117,17 +302,50 @@ def get_weather(city: str):
 • Conditions: {weather}
 • Humidity: {humidity}%
 • Wind Speed: {wind_speed} m/s"""
-    elif response.status_code == 401: # Unauthorized - likely an invalid API key
+    elif status == 401: # Unauthorized - likely an invalid API key
         return "Invalid weather API key."
-    elif response.status_code == 404: # Not Found - city not recognized by the API
+    elif status == 404: # Not Found - city not recognized by the API
         return f"City '{city}' not found."
     else:
         # Handle other potential API errors with their status code
-        return f"Failed to get weather. Status: {response.status_code}"
+        return f"Failed to get weather. Status: {status}"
+
+# --- Shared SMTP Session ---
+
+# One authenticated SMTP connection reused across emails, so only the first send pays for the
+# connect + STARTTLS + login handshake. Guarded by a lock because SMTP commands can't interleave.
+_smtp: aiosmtplib.SMTP | None = None
+_smtp_lock = asyncio.Lock()
+
+async def _get_smtp(reconnect: bool = False):
+    """
+    Returns the shared SMTP session, connecting and logging in first if needed. Callers must hold _smtp_lock.
+
+    Args:
+        reconnect: Discard the current connection and open a new one (e.g. after the server disconnected).
+
+    Returns:
+        A connected and authenticated aiosmtplib.SMTP client.
+    """
+    global _smtp
+    if reconnect or _smtp is None or not _smtp.is_connected:
+        if _smtp is not None and _smtp.is_connected:
+            _smtp.close()
+        _smtp = None
+        client = aiosmtplib.SMTP(hostname=CFG.smtp_server, port=CFG.smtp_port, start_tls=True) # Upgrade the connection to TLS on connect
+        try:
+            await client.connect()
+            await client.login(CFG.email_address, CFG.email_password) # Login to the SMTP server using credentials
+        except BaseException:
+            # Never keep a connected but unauthenticated session around: the next send would reuse it and fail
+            client.close()
+            raise
+        _smtp = client # Only publish the client once it's logged in
+    return _smtp
 
 # 2. Email Tool: Sends an email to a specified recipient using SMTP
 @function_tool("send_email")
-def send_email(to_email: str, subject: str, message: str):
+async def send_email(to_email: str, subject: str, message: str):
     """
     Sends an email using SMTP. Requires EMAIL_ADDRESS and EMAIL_PASSWORD environment variables.
 
@@ -140,34 +358,35 @@ def send_email(to_email: str, subject: str, message: str):
         A success message if the email is sent successfully, or an error message if sending fails.
     """
     # Check if email sender credentials are set in environment variables
-    if not EMAIL_ADDRESS or not EMAIL_PASSWORD:
+    if not CFG.email_address or not CFG.email_password:
         return "Email configuration is missing. Please set both EMAIL_ADDRESS and EMAIL_PASSWORD in your .env file."
         
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+
     # Create the email message object using MIMEMultipart to handle different parts (like text)
     msg = MIMEMultipart()
-    msg['From'] = EMAIL_ADDRESS # Set the sender address
+    msg['From'] = CFG.email_address # Set the sender address
     msg['To'] = to_email # Set the recipient address
     msg['Subject'] = subject # Set the email subject
     
     # Attach the plain text body to the email message
     msg.attach(MIMEText(message, 'plain'))
     
-    # Create an SMTP session and send the email within a 'with' statement
-    # This ensures the connection is properly closed afterwards.
-    with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-        
-        server.starttls()  # Upgrade the connection to a secure encrypted one using TLS
-        
-        server.login(EMAIL_ADDRESS, EMAIL_PASSWORD) # Login to the SMTP server using credentials
-        
-        server.send_message(msg) # Send the constructed email message
+    # Send over the shared SMTP session. An SMTP connection handles one transaction at a time,
+    # so sends are serialized; if the server dropped the idle connection, reconnect once and retry.
+    async with _smtp_lock:
+        try:
+            await (await _get_smtp()).send_message(msg)
+        except aiosmtplib.SMTPServerDisconnected:
+            await (await _get_smtp(reconnect=True)).send_message(msg)
         
     # Return a success message if no exception occurred
     return f"Email successfully sent to {to_email}!"
 
 # 3. News Tool: Fetches the latest news or news about a specific topic
 @function_tool("news")
-def get_news(query: str = None, category: str = None):
+async def get_news(query: str = None, category: str = None):
     """
     Fetches the latest news articles based on a query or category using the NewsData.io API.
 
@@ -179,14 +398,8 @@ def get_news(query: str = None, category: str = None):
         A formatted string containing a summary of recent news articles or a message
         indicating no articles were found or an error occurred.
     """
-    # Base URL for the news API
-    base_url = "https://newsdata.io/api/1/latest"
-    
     # Parameters dictionary for the API request
-    params = {
-        "apikey": NEWS_API_KEY, # Include the API key
-        "language": "en" # Requesting news in English language
-    }
+    params = {**_NEWS_PARAMS}
     
     # Add query and category to parameters if they were provided by the user
     if query:
@@ -194,12 +407,12 @@ def get_news(query: str = None, category: str = None):
     if category:
         params["category"] = category
     
-    # Make the HTTP GET request to the news API with the specified parameters
-    response = requests.get(base_url, params=params)
+    # Make the HTTP GET request to the news API with the specified parameters (or reuse a recent response).
+    # Lookups issued together, e.g. several topics in one turn, are dispatched as one concurrent batch.
+    status, data = await news_loader.load((query, category), params)
     
     # Process the API response based on status code
-    if response.status_code == 200: # Success
-        data = response.json() # Parse the JSON response body
+    if status == 200: # Success
         articles = data.get("results", []) # Get the list of articles, default to an empty list if 'results' key is missing
         
         # Check if any articles were returned in the response
@@ -218,7 +431,22 @@ def get_news(query: str = None, category: str = None):
         return news_summary # Return the formatted summary
     else:
         # Handle API errors with their status code
-        return f"News fetch failed. Status: {response.status_code}" # Inform the user about the failure and status code
+        return f"News fetch failed. Status: {status}" # Inform the user about the failure and status code
+
+# One translator per target language, created (and deep-translator imported) on first use. Instances keep
+# per-request state, so each comes with a lock for when translations to the same language overlap.
+@functools.lru_cache(maxsize=64)
+def _translator(target_language: str):
+    from deep_translator import GoogleTranslator
+    return GoogleTranslator(source='auto', target=target_language), threading.Lock()
+
+def _translate(text: str, target_language: str):
+    translator, lock = _translator(target_language)
+    with lock:
+        return translator.translate(text)
+
+# Recent translations, keyed by (text, target language), since the same strings are often translated again
+_translation_cache = LRUCache(maxsize=1024)
 
 # 4. Translate Tool: Translates text from one language to another
 @function_tool("translate_text")
@@ -234,8 +462,12 @@ async def translate_text(text: str, target_language: str = "ur"):
         A formatted string showing the original text and its translation, or an error message if translation fails.
     """
     # Use deep-translator which is often more reliable for various languages than simple requests
-    translator = GoogleTranslator(source='auto', target=target_language) # Auto-detect source language
-    translation = translator.translate(text) # Perform the translation
+    key = (text, target_language)
+    translation = _translation_cache.get(key)
+    if translation is None:
+        # Perform the translation in a worker thread (the library is blocking), auto-detecting the source language
+        translation = await asyncio.to_thread(_translate, text, target_language)
+        _translation_cache[key] = translation
     
     # Format the response string to show both original and translated text
     response = f"Original: {text}\nTranslation: {translation}"
@@ -244,7 +476,7 @@ async def translate_text(text: str, target_language: str = "ur"):
 
 # 5. Cryptocurrency Tool: Fetches current cryptocurrency prices using CoinGecko API
 @function_tool("crypto_price")
-def get_crypto_price(crypto: str = "bitcoin"):
+async def get_crypto_price(crypto: str = "bitcoin"):
     """
     Fetches current cryptocurrency price data using the CoinGecko API.
 
@@ -256,31 +488,19 @@ def get_crypto_price(crypto: str = "bitcoin"):
         A formatted string containing the current price and other relevant information,
         or an error message if the API request fails.
     """
-    # Map common symbols to their CoinGecko IDs
-    crypto_map = {
-        "btc": "bitcoin",
-        "eth": "ethereum",
-        "sol": "solana",
-        "bitcoin": "bitcoin",
-        "ethereum": "ethereum",
-        "solana": "solana"
-    }
-    
     # Convert input to lowercase and map to CoinGecko ID if it's a known symbol
     crypto = crypto.lower()
-    crypto_id = crypto_map.get(crypto, crypto)
+    crypto_id = CRYPTO_MAP.get(crypto, crypto)
     
-    # Construct the API URL with the cryptocurrency ID
-    url = f"https://api.coingecko.com/api/v3/simple/price?ids={crypto_id}&vs_currencies=usd,gbp,eur&include_24hr_change=true"
+    # Construct the API request parameters with the cryptocurrency ID
+    params = {**_COINGECKO_PARAMS, "ids": crypto_id}
     
     try:
-        # Make the HTTP GET request to the CoinGecko API
-        response = requests.get(url)
+        # Make the HTTP GET request to the CoinGecko API (or reuse a recent response for the same coin)
+        status, data = await _cached_get_json(_crypto_cache, crypto_id, COINGECKO_PRICE_URL, params)
         
         # Process the API response based on status code
-        if response.status_code == 200:  # Success
-            data = response.json()
-            
+        if status == 200:  # Success
             # Check if we got data for the requested cryptocurrency
             if crypto_id in data:
                 price_data = data[crypto_id]
@@ -297,16 +517,51 @@ def get_crypto_price(crypto: str = "bitcoin"):
 24h Change: {change_24h:+.2f}%"""
             else:
                 return f"Could not find price data for {crypto}. Please check the cryptocurrency name or symbol."
-        elif response.status_code == 404:
+        elif status == 404:
             return f"Could not find cryptocurrency '{crypto}'. Please check the name or symbol and try again."
         else:
-            return f"Failed to get cryptocurrency price. Status: {response.status_code}"
+            return f"Failed to get cryptocurrency price. Status: {status}"
     except Exception as e:
         return f"Error retrieving cryptocurrency price: {str(e)}"
 
+# Formats one condition's entry of the medications database into the tool's response text
+def _format_med(med_info):
+    response_text = f"""Information about {med_info['name']}:
+• Description: {med_info['description']}
+
+Common Medications:"""
+    
+    for med in med_info['medications']:
+        response_text += f"\n\n{med['name']}:"
+        response_text += f"\n• Purpose: {med['description']}"
+        response_text += f"\n• Examples: {', '.join(med['examples'])}"
+    
+    response_text += "\n\nImportant Precautions:"
+    for precaution in med_info['precautions']:
+        response_text += f"\n• {precaution}"
+    
+    response_text += "\n\nNote: This information is for educational purposes only. Please consult a healthcare professional for proper diagnosis and treatment."
+    return response_text
+
+# Path of the common medications database used by the health tool
+MEDICATIONS_PATH = Path(__file__).parent / "data" / "medications.json"
+
+# Loads the medications database on the first health query. Every response is formatted once and the
+# condition keys are compiled into an Aho-Corasick automaton, so a query is scanned once no matter how
+# many conditions exist; the raw database itself is not kept in memory.
+@functools.lru_cache(maxsize=1)
+def _load_meds():
+    common_medications = orjson.loads(MEDICATIONS_PATH.read_bytes())
+    responses = {key: _format_med(med_info) for key, med_info in common_medications.items()}
+    automaton = ahocorasick.Automaton()
+    for key in common_medications:
+        automaton.add_word(key, key)
+    automaton.make_automaton()
+    return responses, automaton, ", ".join(common_medications.keys())
+
 # 6. Health Information Tool: Provides health-related information from the local database
 @function_tool("health_info")
-def get_health_info(query: str, info_type: str = "medication"):
+async def get_health_info(query: str, info_type: str = "medication"):
     """
     Provides health-related information from the local database.
 
@@ -317,262 +572,20 @@ def get_health_info(query: str, info_type: str = "medication"):
     Returns:
         A formatted string containing health information or a message if no information is found.
     """
-    # Common medications database for quick reference
-    common_medications = {
-        "abdominal pain": {
-            "name": "Common Medications for Abdominal Pain",
-            "description": "Various medications can help with abdominal pain, depending on the cause.",
-            "medications": [
-                {
-                    "name": "Antacids",
-                    "description": "For acid-related pain and heartburn",
-                    "examples": ["Tums", "Rolaids", "Maalox"]
-                },
-                {
-                    "name": "Anti-spasmodics",
-                    "description": "For cramping and spasms",
-                    "examples": ["Hyoscyamine", "Dicyclomine"]
-                },
-                {
-                    "name": "Pain relievers",
-                    "description": "For general pain relief",
-                    "examples": ["Acetaminophen (Tylenol)", "Ibuprofen (Advil)"]
-                },
-                {
-                    "name": "Anti-gas medications",
-                    "description": "For gas-related pain",
-                    "examples": ["Simethicone (Gas-X)"]
-                }
-            ],
-            "precautions": [
-                "Always consult a doctor before taking any medication",
-                "Some medications may interact with other drugs",
-                "Follow dosage instructions carefully",
-                "Seek immediate medical attention if pain is severe or persistent"
-            ]
-        },
-        "headache": {
-            "name": "Common Medications for Headache",
-            "description": "Various medications can help with headache pain, depending on the type and severity.",
-            "medications": [
-                {
-                    "name": "Pain relievers",
-                    "description": "For general headache pain",
-                    "examples": ["Acetaminophen (Tylenol)", "Ibuprofen (Advil)", "Aspirin"]
-                },
-                {
-                    "name": "Migraine medications",
-                    "description": "For migraine headaches",
-                    "examples": ["Sumatriptan", "Rizatriptan"]
-                }
-            ],
-            "precautions": [
-                "Always consult a doctor before taking any medication",
-                "Some medications may interact with other drugs",
-                "Follow dosage instructions carefully",
-                "Seek immediate medical attention if headache is severe or persistent"
-            ]
-        },
-        "migraine": {
-            "name": "Common Medications for Migraine",
-            "description": "Migraine treatments can include both preventive and acute medications.",
-            "medications": [
-                {
-                    "name": "Acute treatments",
-                    "description": "Medications taken when a migraine attack begins",
-                    "examples": ["Sumatriptan (Imitrex)", "Rizatriptan (Maxalt)", "Eletriptan (Relpax)"]
-                },
-                {
-                    "name": "Pain relievers",
-                    "description": "For mild to moderate migraine pain",
-                    "examples": ["Acetaminophen (Tylenol)", "Ibuprofen (Advil)", "Naproxen (Aleve)"]
-                },
-                {
-                    "name": "Anti-nausea medications",
-                    "description": "For migraine-related nausea",
-                    "examples": ["Metoclopramide", "Prochlorperazine"]
-                }
-            ],
-            "precautions": [
-                "Always consult a doctor before taking any medication",
-                "Some medications may interact with other drugs",
-                "Follow dosage instructions carefully",
-                "Seek immediate medical attention if symptoms are severe",
-                "Keep a migraine diary to track triggers and effectiveness of treatments"
-            ]
-        },
-        "liver": {
-            "name": "Common Medications for Liver Conditions",
-            "description": "Liver conditions require careful management and specific medications based on the underlying cause.",
-            "medications": [
-                {
-                    "name": "Hepatitis treatments",
-                    "description": "For viral hepatitis",
-                    "examples": ["Entecavir", "Tenofovir", "Sofosbuvir"]
-                },
-                {
-                    "name": "Liver protectants",
-                    "description": "To support liver function",
-                    "examples": ["Ursodeoxycholic acid", "Silymarin (Milk thistle)"]
-                },
-                {
-                    "name": "Pain management",
-                    "description": "For liver-related pain",
-                    "examples": ["Acetaminophen (in limited doses)", "Tramadol"]
-                }
-            ],
-            "precautions": [
-                "Always consult a doctor before taking any medication",
-                "Avoid alcohol and certain medications that can harm the liver",
-                "Regular liver function tests may be required",
-                "Seek immediate medical attention for severe pain or jaundice",
-                "Some medications may need dose adjustments based on liver function"
-            ]
-        },
-        "diabetes": {
-            "name": "Common Medications for Diabetes",
-            "description": "Diabetes management involves various medications to control blood sugar levels.",
-            "medications": [
-                {
-                    "name": "Insulin",
-                    "description": "For type 1 diabetes and some type 2 cases",
-                    "examples": ["Regular insulin", "NPH insulin", "Insulin glargine"]
-                },
-                {
-                    "name": "Oral medications",
-                    "description": "For type 2 diabetes",
-                    "examples": ["Metformin", "Sulfonylureas", "DPP-4 inhibitors"]
-                },
-                {
-                    "name": "GLP-1 receptor agonists",
-                    "description": "Injectable medications for type 2 diabetes",
-                    "examples": ["Liraglutide", "Dulaglutide", "Semaglutide"]
-                }
-            ],
-            "precautions": [
-                "Regular blood sugar monitoring is essential",
-                "Follow a consistent meal schedule",
-                "Be aware of signs of low blood sugar",
-                "Keep emergency glucose tablets handy",
-                "Regular check-ups with healthcare provider"
-            ]
-        },
-        "hypertension": {
-            "name": "Common Medications for High Blood Pressure",
-            "description": "Various medications are used to control high blood pressure.",
-            "medications": [
-                {
-                    "name": "ACE inhibitors",
-                    "description": "Help relax blood vessels",
-                    "examples": ["Lisinopril", "Enalapril", "Ramipril"]
-                },
-                {
-                    "name": "Calcium channel blockers",
-                    "description": "Help relax blood vessel muscles",
-                    "examples": ["Amlodipine", "Diltiazem", "Verapamil"]
-                },
-                {
-                    "name": "Diuretics",
-                    "description": "Help remove excess water and salt",
-                    "examples": ["Hydrochlorothiazide", "Furosemide", "Spironolactone"]
-                }
-            ],
-            "precautions": [
-                "Regular blood pressure monitoring",
-                "Take medications at the same time daily",
-                "Limit salt intake",
-                "Regular exercise as recommended",
-                "Avoid alcohol and smoking"
-            ]
-        },
-        "asthma": {
-            "name": "Common Medications for Asthma",
-            "description": "Asthma treatment includes both rescue and controller medications.",
-            "medications": [
-                {
-                    "name": "Quick-relief medications",
-                    "description": "For immediate symptom relief",
-                    "examples": ["Albuterol", "Levalbuterol", "Terbutaline"]
-                },
-                {
-                    "name": "Controller medications",
-                    "description": "For long-term control",
-                    "examples": ["Inhaled corticosteroids", "Long-acting beta agonists", "Leukotriene modifiers"]
-                },
-                {
-                    "name": "Combination inhalers",
-                    "description": "Combine controller and rescue medications",
-                    "examples": ["Advair", "Symbicort", "Dulera"]
-                }
-            ],
-            "precautions": [
-                "Keep rescue inhaler readily available",
-                "Follow asthma action plan",
-                "Regular check-ups with healthcare provider",
-                "Monitor peak flow readings",
-                "Avoid known triggers"
-            ]
-        },
-        "depression": {
-            "name": "Common Medications for Depression",
-            "description": "Various medications are used to treat depression and related conditions.",
-            "medications": [
-                {
-                    "name": "SSRIs",
-                    "description": "Selective serotonin reuptake inhibitors",
-                    "examples": ["Fluoxetine", "Sertraline", "Escitalopram"]
-                },
-                {
-                    "name": "SNRIs",
-                    "description": "Serotonin-norepinephrine reuptake inhibitors",
-                    "examples": ["Venlafaxine", "Duloxetine", "Desvenlafaxine"]
-                },
-                {
-                    "name": "Atypical antidepressants",
-                    "description": "Other types of antidepressants",
-                    "examples": ["Bupropion", "Mirtazapine", "Trazodone"]
-                }
-            ],
-            "precautions": [
-                "Take medications as prescribed",
-                "Regular follow-up with healthcare provider",
-                "Be aware of potential side effects",
-                "Don't stop medication without consulting doctor",
-                "Combine with therapy for best results"
-            ]
-        }
-    }
-
-    # Check if the query matches any common medication patterns
+    # Check if the query mentions any condition in the common medications database
+    med_responses, med_automaton, med_keys_joined = _load_meds()
     query_lower = query.lower()
     
-    # Extract the condition/symptom from the query
-    for key in common_medications:
-        if key in query_lower:
-            med_info = common_medications[key]
-            response_text = f"""Information about {med_info['name']}:
-• Description: {med_info['description']}
-
-Common Medications:"""
-            
-            for med in med_info['medications']:
-                response_text += f"\n\n{med['name']}:"
-                response_text += f"\n• Purpose: {med['description']}"
-                response_text += f"\n• Examples: {', '.join(med['examples'])}"
-            
-            response_text += "\n\nImportant Precautions:"
-            for precaution in med_info['precautions']:
-                response_text += f"\n• {precaution}"
-            
-            response_text += "\n\nNote: This information is for educational purposes only. Please consult a healthcare professional for proper diagnosis and treatment."
-            return response_text
+    # Return the precomputed response for the first condition/symptom found in the query
+    for _, key in med_automaton.iter(query_lower):
+        return med_responses[key]
 
     # If no match is found in the database
-    return f"I don't have specific information about '{query}'. Please consult a healthcare professional for medical advice. You can ask about: {', '.join(common_medications.keys())}"
+    return f"I don't have specific information about '{query}'. Please consult a healthcare professional for medical advice. You can ask about: {med_keys_joined}"
 
 # 7. Recipe Tool: Fetches recipe information using the Spoonacular API
 @function_tool("get_recipe")
-def get_recipe(query: str, diet: str = None, cuisine: str = None):
+async def get_recipe(query: str, diet: str = None, cuisine: str = None):
     """
     Fetches recipe information using the Spoonacular API.
 
@@ -584,19 +597,11 @@ def get_recipe(query: str, diet: str = None, cuisine: str = None):
     Returns:
         A formatted string containing recipe information.
     """
-    if not SPOONACULAR_API_KEY:
+    if not CFG.spoonacular_api_key:
         return "Recipe service is not configured. Please check the SPOONACULAR_API_KEY environment variable."
 
-    # Construct the API URL
-    base_url = "https://api.spoonacular.com/recipes/complexSearch"
-    params = {
-        "apiKey": SPOONACULAR_API_KEY,
-        "query": query,
-        "addRecipeInformation": True,
-        "number": 1,  # Get one recipe at a time
-        "instructionsRequired": True,
-        "fillIngredients": True
-    }
+    # Construct the API request parameters
+    params = {**_RECIPE_PARAMS, "query": query}
 
     if diet:
         params["diet"] = diet
@@ -604,15 +609,18 @@ def get_recipe(query: str, diet: str = None, cuisine: str = None):
         params["cuisine"] = cuisine
 
     try:
-        response = requests.get(base_url, params=params)
+        cache_key = (query.strip().lower(), diet, cuisine)
+        status, data = await _cached_get_json(_recipe_cache, cache_key, RECIPE_URL, params)
         
-        if response.status_code == 200:
-            data = response.json()
+        if status == 200:
             if not data.get("results"):
                 return f"No recipes found for '{query}'."
             
             recipe = data["results"][0]
             
+            # Index the nutrients by name once instead of scanning the list for each value
+            nutrients = {n['name']: n['amount'] for n in recipe.get('nutrition', {}).get('nutrients', [])}
+            
             # Format the recipe information
             recipe_info = f"""Recipe: {recipe['title']}
 
@@ -626,24 +634,24 @@ Instructions:
 {recipe.get('instructions', 'No instructions available.')}
 
 Nutrition Information:
-• Calories: {recipe.get('nutrition', {}).get('nutrients', [{}])[0].get('amount', 'N/A')} kcal
-• Protein: {next((n['amount'] for n in recipe.get('nutrition', {}).get('nutrients', []) if n['name'] == 'Protein'), 'N/A')}g
-• Carbohydrates: {next((n['amount'] for n in recipe.get('nutrition', {}).get('nutrients', []) if n['name'] == 'Carbohydrates'), 'N/A')}g
-• Fat: {next((n['amount'] for n in recipe.get('nutrition', {}).get('nutrients', []) if n['name'] == 'Fat'), 'N/A')}g
+• Calories: {nutrients.get('Calories', 'N/A')} kcal
+• Protein: {nutrients.get('Protein', 'N/A')}g
+• Carbohydrates: {nutrients.get('Carbohydrates', 'N/A')}g
+• Fat: {nutrients.get('Fat', 'N/A')}g
 
 Source: {recipe.get('sourceUrl', 'N/A')}"""
             
             return recipe_info
-        elif response.status_code == 401:
+        elif status == 401:
             return "Invalid API key for recipe service."
         else:
-            return f"Failed to fetch recipe. Status: {response.status_code}"
+            return f"Failed to fetch recipe. Status: {status}"
     except Exception as e:
         return f"Error fetching recipe: {str(e)}"
 
 # Add the motivation tool function
 @function_tool("get_motivation")
-def get_motivation(category: str = None):
+async def get_motivation(category: str = None):
     """
     Fetches motivational quotes using the ZenQuotes API.
 
@@ -654,22 +662,16 @@ def get_motivation(category: str = None):
         A formatted string containing motivational quotes.
     """
     try:
-        # Base URL for the ZenQuotes API
-        base_url = "https://zenquotes.io/api/quotes"
-        
         # Parameters for the API request
-        params = {
-            "count": 3  # Get 3 quotes at a time
-        }
+        params = {**_QUOTES_PARAMS}
         
         if category:
             params["category"] = category
 
-        # Make the API request
-        response = requests.get(base_url, params=params)
+        # Make the API request (or reuse a recent response for the same category)
+        status, quotes = await _cached_get_json(_motivation_cache, category, QUOTES_URL, params)
         
-        if response.status_code == 200:
-            quotes = response.json()
+        if status == 200:
             
             # Format the quotes
             if isinstance(quotes, list):
@@ -684,13 +686,71 @@ Category: {quote.get('c', 'General')}"""
             else:
                 return "No quotes found."
         else:
-            return f"Failed to fetch quotes. Status: {response.status_code}"
+            return f"Failed to fetch quotes. Status: {status}"
     except Exception as e:
         return f"Error fetching quotes: {str(e)}"
 
+# Country names that make a location too general to route between, matched as whole words in one regex pass
+_COUNTRY_RE = re.compile(
+    r"\b(usa|united states|america|canada|mexico|uk|united kingdom|england|france|germany|china|india|australia|pakistan)\b",
+    re.IGNORECASE
+)
+
+def is_country_only(location):
+    return bool(_COUNTRY_RE.search(location))
+
+# At most this many OSRM requests are in flight at once
+_OSRM_SEMAPHORE = asyncio.Semaphore(4)
+
+# Straight-line distance above which a driving route is not even requested
+MAX_ROUTE_DISTANCE_KM = 8000
+NO_ROUTE_MESSAGE = "Could not calculate the driving route. The locations might be too far apart or not connected by roads."
+
+# Response template of the location tool, filled in with str.format
+_LOCATION_TEMPLATE = """Location Information:
+
+Pickup Location:
+• Address: {pickup[address]}
+• Coordinates: {pickup[latitude]:.6f}, {pickup[longitude]:.6f}
+
+Dropoff Location:
+• Address: {dropoff[address]}
+• Coordinates: {dropoff[latitude]:.6f}, {dropoff[longitude]:.6f}
+
+Route Information:
+• Driving Distance: {driving_distance:.2f} km
+• Straight-line Distance: {straight_distance:.2f} km
+• Estimated Duration: {duration:.0f} minutes
+• Average Speed: {speed:.1f} km/h
+
+Note: This information is provided by OpenStreetMap and is free to use under the Open Database License."""
+
+# Nominatim geocoder shared by all location queries, created on first use (geopy is imported lazily).
+# Its aiohttp session stays open, so repeated lookups reuse the connection to Nominatim.
+_geolocator = None
+_geocode = None
+
+def _get_geocode():
+    global _geolocator, _geocode
+    if _geocode is None:
+        from geopy.adapters import AioHTTPAdapter
+        from geopy.extra.rate_limiter import AsyncRateLimiter
+        from geopy.geocoders import Nominatim
+
+        # Initialize the Nominatim geocoder with a proper user agent; the aiohttp adapter makes it non-blocking
+        _geolocator = Nominatim(
+            user_agent="MyLocationApp/1.0 (https://github.com/yourusername/yourrepo; your@email.com)",
+            timeout=10,
+            adapter_factory=AioHTTPAdapter
+        )
+        # Nominatim allows one request per second. The limiter spans all calls and only waits when the
+        # previous request was less than that long ago; failed lookups are retried after a pause.
+        _geocode = AsyncRateLimiter(_geolocator.geocode, min_delay_seconds=1.1, max_retries=2, error_wait_seconds=2.0)
+    return _geocode
+
 # Add the location tool function
 @function_tool("get_location_info")
-def get_location_info(pickup_location: str, dropoff_location: str):
+async def get_location_info(pickup_location: str, dropoff_location: str):
     """
     Gets location information and calculates route between two locations using OpenStreetMap services.
 
@@ -701,22 +761,13 @@ def get_location_info(pickup_location: str, dropoff_location: str):
     Returns:
         A formatted string containing location details and route information.
     """
+    from geopy.distance import geodesic
+
     try:
-        # Initialize the Nominatim geocoder with a proper user agent
-        geolocator = Nominatim(
-            user_agent="MyLocationApp/1.0 (https://github.com/yourusername/yourrepo; your@email.com)",
-            timeout=10
-        )
+        # Get the shared, rate-limited Nominatim geocoder
+        geocode = _get_geocode()
 
         # Check if locations are too general (just countries)
-        def is_country_only(location):
-            common_countries = [
-                "usa", "united states", "america", "canada", "mexico", "uk", "united kingdom",
-                "england", "france", "germany", "china", "india", "australia", "pakistan"
-            ]
-            location_lower = location.lower()
-            return any(country in location_lower for country in common_countries)
-
         if is_country_only(pickup_location) or is_country_only(dropoff_location):
             return """I need more specific locations to calculate the distance. Please provide cities or specific addresses.
 
@@ -730,32 +781,46 @@ Try:
 This will help me provide accurate distance and route information."""
 
         # Function to geocode a location using Nominatim
-        def geocode_location(location):
+        async def geocode_location(location):
+            # Known locations are answered from the cache, skipping the rate-limit delay and the request
+            key = f"geo:{location.strip().lower()}"
+            hit = _GEO_CACHE.get(key)
+            if hit is not None:
+                return hit
+            # If the same location is already being looked up (e.g. by another user), wait for that result
+            inflight = _GEOCODE_INFLIGHT.get(key)
+            if inflight is not None:
+                return await asyncio.shield(inflight)
+            future = asyncio.get_running_loop().create_future()
+            _GEOCODE_INFLIGHT[key] = future
+            info = None
             try:
-                # Add a small delay to respect rate limits
-                time.sleep(1)
-                result = geolocator.geocode(location)
+                result = await geocode(location)
                 if result:
-                    return {
+                    info = {
                         "address": result.address,
                         "latitude": result.latitude,
                         "longitude": result.longitude,
                         "raw": result.raw
                     }
-                return None
+                    _GEO_CACHE.set(key, info, expire=GEOCODE_TTL)
             except Exception as e:
-                print(f"Geocoding error for {location}: {str(e)}")
-                return None
-
-        # Get coordinates for pickup location
-        print(f"Processing pickup location: {pickup_location}")
-        pickup_info = geocode_location(pickup_location)
+                logger.warning("Geocoding error for %s: %s", location, e)
+            finally:
+                _GEOCODE_INFLIGHT.pop(key, None)
+                if not future.done():
+                    future.set_result(info)
+            return info
+
+        # Get coordinates for both locations concurrently
+        logger.debug("Processing pickup location: %s", pickup_location)
+        logger.debug("Processing dropoff location: %s", dropoff_location)
+        pickup_info, dropoff_info = await asyncio.gather(
+            geocode_location(pickup_location),
+            geocode_location(dropoff_location)
+        )
         if not pickup_info:
             return f"Could not find coordinates for pickup location: {pickup_location}. Please try with a more specific address."
-
-        # Get coordinates for dropoff location
-        print(f"Processing dropoff location: {dropoff_location}")
-        dropoff_info = geocode_location(dropoff_location)
         if not dropoff_info:
             return f"Could not find coordinates for dropoff location: {dropoff_location}. Please try with a more specific address."
 
@@ -765,44 +830,58 @@ This will help me provide accurate distance and route information."""
             (dropoff_info["latitude"], dropoff_info["longitude"])
         ).kilometers
 
-        # Get driving route using OSRM
-        osrm_url = f"http://router.project-osrm.org/route/v1/driving/{pickup_info['longitude']},{pickup_info['latitude']};{dropoff_info['longitude']},{dropoff_info['latitude']}?overview=full"
-        
-        response = requests.get(osrm_url)
-        if response.status_code == 200:
-            route_data = response.json()
-            if route_data["code"] == "Ok":
-                route = route_data["routes"][0]
-                driving_distance = route["distance"] / 1000  # Convert to kilometers
-                duration = route["duration"] / 60  # Convert to minutes
-
-                # Format the response
-                response = f"""Location Information:
-
-Pickup Location:
-• Address: {pickup_info['address']}
-• Coordinates: {pickup_info['latitude']:.6f}, {pickup_info['longitude']:.6f}
-
-Dropoff Location:
-• Address: {dropoff_info['address']}
-• Coordinates: {dropoff_info['latitude']:.6f}, {dropoff_info['longitude']:.6f}
-
-Route Information:
-• Driving Distance: {driving_distance:.2f} km
-• Straight-line Distance: {straight_distance:.2f} km
-• Estimated Duration: {duration:.0f} minutes
-• Average Speed: {(driving_distance / (duration/60)):.1f} km/h
-
-Note: This information is provided by OpenStreetMap and is free to use under the Open Database License."""
+        # Locations this far apart (e.g. on different continents) have no driving route, so skip the OSRM request
+        if straight_distance > MAX_ROUTE_DISTANCE_KM:
+            return NO_ROUTE_MESSAGE
 
-                return response
+        # Get driving route using OSRM; only distance and duration are used, so skip the route geometry and steps
+        osrm_url = f"{OSRM_ROUTE_URL}{pickup_info['longitude']},{pickup_info['latitude']};{dropoff_info['longitude']},{dropoff_info['latitude']}?overview=false&alternatives=false&steps=false"
+        
+        # Reuse the route for the same endpoints if it was calculated before. Coordinates are snapped to 3 decimals
+        # (~110 m), so slightly different geocodes of the same place share one cached route.
+        route_key = f"osrm:{pickup_info['longitude']:.3f},{pickup_info['latitude']:.3f};{dropoff_info['longitude']:.3f},{dropoff_info['latitude']:.3f}"
+        entry = _GEO_CACHE.get(route_key)
+        if entry is not None and time.time() - entry.get("fetched", 0) < ROUTE_TTL:
+            route_data = entry["body"]
+        else:
+            # A stale route is revalidated: if OSRM answers 304 Not Modified, the stored body is reused
+            headers = {"If-None-Match": entry["etag"]} if entry is not None and entry.get("etag") else None
+            # Requests to the public OSRM server are capped and retried with backoff, since it rate-limits bursts
+            try:
+                async with _OSRM_SEMAPHORE:
+                    response = await _get_with_retry(osrm_url, headers=headers)
+            except httpx.HTTPStatusError as e:
+                return f"Error getting route information. Status code: {e.response.status_code}"
+            if response.status_code == 304 and entry is not None:
+                route_data = entry["body"]
+            elif response.status_code == 200:
+                route_data = orjson.loads(response.content)
+                entry = {"etag": response.headers.get("ETag"), "body": route_data}
             else:
-                return "Could not calculate the driving route. The locations might be too far apart or not connected by roads."
+                return f"Error getting route information. Status code: {response.status_code}"
+            if route_data["code"] == "Ok":
+                entry["fetched"] = time.time()
+                _GEO_CACHE.set(route_key, entry, expire=ROUTE_STALE_TTL)
+
+        if route_data["code"] == "Ok":
+            route = route_data["routes"][0]
+            driving_distance = route["distance"] / 1000  # Convert to kilometers
+            duration = route["duration"] / 60  # Convert to minutes
+
+            # Format the response
+            return _LOCATION_TEMPLATE.format(
+                pickup=pickup_info,
+                dropoff=dropoff_info,
+                driving_distance=driving_distance,
+                straight_distance=straight_distance,
+                duration=duration,
+                speed=driving_distance / (duration/60)
+            )
         else:
-            return f"Error getting route information. Status code: {response.status_code}"
+            return NO_ROUTE_MESSAGE
 
     except Exception as e:
-        print(f"General error: {str(e)}")
+        logger.exception("Error getting location information")
         return f"Error getting location information: {str(e)}"
 
 # --- Specialized Agents (An agent for each task) ---
@@ -911,6 +990,43 @@ For other general questions, answer directly.
     tools=[get_weather, send_email, get_news, translate_text, get_crypto_price, get_health_info, get_recipe, get_motivation, get_location_info]
 )
 
+# --- Conversation History ---
+
+# Number of messages kept per chat session
+HISTORY_MAXLEN = 50
+
+# --- Keyword Routing ---
+
+# Keywords that select the agent shown for a message. All lists are compiled into one alternation regex
+# with a named group per agent; keywords only match as whole words (so "to" doesn't fire inside "tomorrow"
+# and "sol" doesn't fire inside "solve"). Matching is case-insensitive, so the message is searched as is
+# without building a lowercased copy. When several agents match, the one listed
+# first wins, e.g. "I want to know the weather" is a Weather Agent message even though "to" comes first.
+_AGENT_KEYWORDS = [
+    ("weather", "Weather Agent", ["weather", "temperature", "forecast"]),
+    ("email", "Email Agent", ["email", "send", "mail"]),
+    ("translator", "Translator Agent", ["translate", "translation"]),
+    ("news", "News Agent", ["news", "latest", "headlines"]),
+    ("crypto", "Crypto Agent", ["crypto", "bitcoin", "btc", "ethereum", "eth", "solana", "sol", "price"]),
+    ("health", "Health Agent", ["health", "medical", "condition", "symptom", "medication", "disease", "illness", "medicine", "med", "pain", "ache", "migraine", "headache"]),
+    ("recipe", "Recipe Agent", ["recipe", "cook", "food", "dish", "meal", "ingredients", "how to make"]),
+    ("motivation", "Motivation Agent", ["motivation", "inspire", "quote", "inspirational", "motivational", "encourage", "uplift"]),
+    ("location", "Location Agent", ["location", "distance", "pickup", "dropoff", "pick up", "drop off", "from", "to", "between", "route", "directions"]),
+]
+_ROUTER_AGENTS = {tag: agent_type for tag, agent_type, _ in _AGENT_KEYWORDS}
+_ROUTER_RE = re.compile("|".join(
+    rf"(?P<{tag}>\b(?:{'|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))})\b)"
+    for tag, _, words in _AGENT_KEYWORDS
+), re.IGNORECASE)
+_ROUTER_PRIORITY = {tag: i for i, (tag, _, _) in enumerate(_AGENT_KEYWORDS)}
+
+def route_agent(text):
+    """Returns the agent type for a message: the highest-priority agent with a keyword in it, else General Assistant."""
+    tags = {match.lastgroup for match in _ROUTER_RE.finditer(text)}
+    if not tags:
+        return "General Assistant"
+    return _ROUTER_AGENTS[min(tags, key=_ROUTER_PRIORITY.__getitem__)]
+
 # --- Chainlit Handlers (Chat Start and User Messages) ---
 
 # These functions are called by the Chainlit framework in response to user interactions.
@@ -919,7 +1035,8 @@ For other general questions, answer directly.
 @cl.on_chat_start
 async def chat_start():
     # Initialize user message history for the current session. This history is used to provide context to the agent.
-    cl.user_session.set("history", [])
+    # It's a ring buffer, so long sessions keep only the last HISTORY_MAXLEN messages and appends stay O(1).
+    cl.user_session.set("history", deque(maxlen=HISTORY_MAXLEN))
     # Define and send a welcome message to the user at the beginning of the chat.
     welcome_msg = """Welcome! I'm your AI Assistant. I can help you with:
 1. Checking the weather
@@ -935,6 +1052,15 @@ async def chat_start():
 How can I help you today? 😊"""
     await cl.Message(content=welcome_msg).send() # Send the welcome message to the chat interface
 
+# Closes the shared network clients when the Chainlit server shuts down, so no sockets are leaked.
+@cl.on_app_shutdown
+async def close_clients():
+    await HTTP.aclose()
+    if _geolocator is not None:
+        await _geolocator.__aexit__(None, None, None) # Closes the geocoder's aiohttp session
+    if _smtp is not None and _smtp.is_connected:
+        await _smtp.quit()
+
 # Handles incoming messages from the user.
 @cl.on_message
 async def handle_message(message: cl.Message):
@@ -948,51 +1074,61 @@ async def handle_message(message: cl.Message):
     history = cl.user_session.get("history")
     history.append({"role": "user", "content": message.content})
 
-    # Analyze user input
-    user_input = message.content.lower()
-    agent_type = "General Assistant"
-
-    # Use keywords to determine the appropriate agent
-    if any(word in user_input for word in ["weather", "temperature", "forecast"]):
-        agent_type = "Weather Agent"
-    elif any(word in user_input for word in ["email", "send", "mail"]):
-        agent_type = "Email Agent"
-    elif any(word in user_input for word in ["translate", "translation"]):
-        agent_type = "Translator Agent"
-    elif any(word in user_input for word in ["news", "latest", "headlines"]):
-        agent_type = "News Agent"
-    elif any(word in user_input for word in ["crypto", "bitcoin", "btc", "ethereum", "eth", "solana", "sol", "price"]):
-        agent_type = "Crypto Agent"
-    elif any(word in user_input for word in ["health", "medical", "condition", "symptom", "medication", "disease", "illness", "medicine", "med", "pain", "ache", "migraine", "headache"]):
-        agent_type = "Health Agent"
-    elif any(word in user_input for word in ["recipe", "cook", "food", "dish", "meal", "ingredients", "how to make"]):
-        agent_type = "Recipe Agent"
-    elif any(word in user_input for word in ["motivation", "inspire", "quote", "inspirational", "motivational", "encourage", "uplift"]):
-        agent_type = "Motivation Agent"
-    elif any(word in user_input for word in ["location", "distance", "pickup", "dropoff", "pick up", "drop off", "from", "to", "between", "route", "directions"]):
-        agent_type = "Location Agent"
-
-    # Send processing message
-    await cl.Message(
-        content=f"🤖 {agent_type} is analyzing your query...",
-        author=agent_type
-    ).send()
-
-    # Run the main agent
-    result = await Runner.run(
+    # Use keywords to determine the appropriate agent (one regex pass over the message)
+    agent_type = route_agent(message.content)
+
+    # Each turn is run on the current message alone, so a cached answer to a similar question can be reused.
+    # The cache is shared by all chat sessions, so it only covers general questions: a message with a task
+    # keyword (email, weather, location, ...) usually names its own recipient, city or address, and a reply to
+    # it (even a clarifying one like "What should the email say?") must not be served to a paraphrase with
+    # different details, or to another user. A general question can still mention names or numbers that make
+    # a close paraphrase need a different answer; the high similarity threshold is what guards against that.
+    # The cache is optional: if the embedding model can't be loaded, the message is answered without it.
+    embedding = None
+    if agent_type == "General Assistant":
+        try:
+            embedding = await embed(message.content)
+        except Exception:
+            logger.warning("Response cache unavailable, embedding failed", exc_info=True)
+    if embedding is not None:
+        cached = response_cache.search(embedding)
+        if cached is not None:
+            history.append({"role": "assistant", "content": cached})
+            await cl.Message(content=cached, author=agent_type).send()
+            return
+
+    # Start the main agent first: run_streamed schedules the run in the background and returns at once,
+    # so the model call is already in flight while the processing message goes out to the UI
+    result = Runner.run_streamed(
         starting_agent=main_agent,
         input=[{"role": "user", "content": message.content}],
         run_config=config
     )
 
-    # Update history and send response
+    # Send processing message; the response then streams into the same message
+    msg = cl.Message(
+        content=f"🤖 {agent_type} is analyzing your query...",
+        author=agent_type
+    )
+    await msg.send()
+
+    # Forward the answer to the chat as it is generated
+    placeholder = True
+    async for event in result.stream_events():
+        if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+            # The first token replaces the placeholder text, later ones are appended
+            await msg.stream_token(event.data.delta, is_sequence=placeholder)
+            placeholder = False
+    msg.content = result.final_output
+    await msg.update()
+
+    # Update history (the session holds the deque itself, so no need to set it again)
     history.append({"role": "assistant", "content": result.final_output})
-    cl.user_session.set("history", history)
 
-    await cl.Message(
-        content=result.final_output,
-        author=agent_type
-    ).send()
+    # Only answers the model gave on its own are cached; anything built from a tool call
+    # (weather, prices, news, ...) is live data or has a side effect (email) and must not be replayed
+    if embedding is not None and not any(isinstance(item, ToolCallItem) for item in result.new_items):
+        response_cache.add(embedding, result.final_output)
 
 # --- Run the Chainlit App ---
 
@@ -1,36 +1,31 @@
 import requests
-from dotenv import load_dotenv
-import json
-import os 
+from config import CFG
 
-load_dotenv()
-
-api_key = os.getenv("OPEN_ROUTER_API_KEY")
+api_key = CFG.open_router_api_key
 model = "deepseek/deepseek-chat-v3-0324:free"
 base_url = "https://openrouter.ai/api/v1"
 
-
-response = requests.post(
-    url=f"{base_url}/chat/completions",
-    headers={
-        "Authorization": f"Bearer {api_key}" # bearer ek keyword he jo batata he ke ap token bhej rahe ho
-    },
-    data= json.dumps({
-        "model":model,
-        "messages":[
-            {
-                "role":"user",
-                "content":"what is python"
-            }
-        ]
-    })
-)
-
-data = response.json()
-print(data["choices"][0]["message"]["content"])
-
-
-
-
-
-
+# Reused across requests so the connection to OpenRouter stays open
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    "Authorization": f"Bearer {api_key}" # bearer ek keyword he jo batata he ke ap token bhej rahe ho
+})
+
+
+if __name__ == "__main__":
+    response = _SESSION.post(
+        url=f"{base_url}/chat/completions",
+        json={
+            "model":model,
+            "messages":[
+                {
+                    "role":"user",
+                    "content":"what is python"
+                }
+            ]
+        },
+        timeout=60
+    )
+
+    data = response.json()
+    print(data["choices"][0]["message"]["content"])
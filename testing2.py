@@ -5,20 +5,33 @@ from agents import Agent, AsyncOpenAI, OpenAIChatCompletionsModel, RunConfig, Ru
 
 # Import OS for interacting with the operating system (like accessing environment variables)
 import os
+# Import regular expressions for keyword-based message routing
+import re
+# Import deque for the bounded per-session message history
+from collections import deque
 # Import libraries to load environment variables from a .env file
 from dotenv import load_dotenv, find_dotenv
 
 # Import Chainlit library for creating the interactive chat interface
 import chainlit as cl
 
-# Import libraries for making HTTP requests (used by weather and news tools)
-import requests
-# Import libraries for sending emails via SMTP
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-# Import library for text translation
-from deep_translator import GoogleTranslator
+# Import asyncio, a thread pool and functools to run blocking tools off the event loop
+import asyncio
+import contextlib
+import functools
+# Import time for the monotonic clock used by the tool result caches
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Import async HTTP client library (used by weather, news and crypto tools) and a fast JSON parser for its responses
+import aiohttp
+import orjson
+# Import a queue and thread for the SMTP connection pool.
+# smtplib, email and deep_translator are imported inside the functions that use them, so chats that never
+# send an email or translate don't pay for loading them.
+import queue
+import threading
+import atexit
 
 # --- Load Environment Variables ---
 
@@ -61,14 +74,224 @@ config = RunConfig(
     tracing_disabled=True # Set to False to see detailed model tracing (tool calls, reasoning) in the Chainlit UI
 )
 
+# --- Tool Concurrency ---
+
+# The runner already starts all tool calls from one model response together (asyncio.gather), so a turn
+# like "weather in Paris, AI news and BTC price" costs the slowest call, not the sum. Each chat session gets
+# a semaphore (created in chat_start) capping how many of its tool calls do I/O at once, so one chat's fan-out
+# can't crowd out other users; set TOOL_CONCURRENCY_LIMIT to tune it.
+TOOL_CONCURRENCY_LIMIT = int(os.getenv("TOOL_CONCURRENCY_LIMIT", "8"))
+
+def get_tool_slots():
+    """Returns the current chat session's tool concurrency semaphore."""
+    return cl.user_session.get("tool_slots")
+
+# --- HTTP Session ---
+
+# Each chat session gets one aiohttp session (created in chat_start, closed in chat_end), so tool calls
+# reuse pooled connections and the runner can await several tool calls concurrently.
+# All sessions share one connector, so keep-alive connections to the APIs outlive a single chat.
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=10, connect=3)
+RETRY_STATUSES = {429, 500, 502, 503, 504} # Rate limits and transient server errors worth retrying
+HTTP_RETRIES = 3
+RETRY_BACKOFF = 0.3 # Seconds; doubles after each failed attempt
+MAX_RETRY_AFTER = 5 # Longest Retry-After wait honored before giving up on the retry
+_CONNECTOR = None
+
+def get_connector():
+    """Returns the process-wide connector, creating it on first use (it needs a running event loop)."""
+    global _CONNECTOR
+    if _CONNECTOR is None or _CONNECTOR.closed:
+        # Sized for all chats together (each chat is capped separately by its tool slots); limit_per_host
+        # keeps one slow API from taking every connection in the pool
+        _CONNECTOR = aiohttp.TCPConnector(limit=100, limit_per_host=50, ttl_dns_cache=300)
+    return _CONNECTOR
+
+def get_http():
+    """Returns the current chat session's aiohttp session."""
+    return cl.user_session.get("http")
+
+async def fetch_json(url, params=None, session=None, retries=HTTP_RETRIES):
+    """
+    GETs url and returns (status, json body or None). Transient failures (RETRY_STATUSES, dropped connections,
+    timeouts) are retried with exponential backoff, honoring Retry-After, so a blip costs a short wait here
+    instead of a failed tool call and another model turn.
+    Uses the current chat's session and tool slots unless another session is given (for background tasks
+    outside a chat, which make one request at a time). Pass retries=0 to handle failures yourself.
+    """
+    if session is None:
+        session, slots = get_http(), get_tool_slots()
+    else:
+        slots = contextlib.nullcontext()
+    for attempt in range(retries + 1):
+        delay = RETRY_BACKOFF * 2 ** attempt
+        try:
+            async with slots, session.get(url, params=params) as response:
+                status = response.status
+                if status == 200:
+                    return status, orjson.loads(await response.read())
+                retry_after = response.headers.get("Retry-After", "")
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if attempt == retries:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        if status not in RETRY_STATUSES or attempt == retries:
+            return status, None
+        if retry_after.isdigit():
+            if int(retry_after) > MAX_RETRY_AFTER:
+                return status, None # Not worth holding the tool call that long
+            delay = max(delay, int(retry_after))
+        await asyncio.sleep(delay)
+
+# --- Blocking Tool Pool ---
+
+# Tools built on blocking libraries (smtplib, deep_translator) run in this pool so they don't stall
+# the event loop and several tool calls in one model turn can run side by side.
+_TOOL_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tool")
+
+def async_tool(name):
+    """Registers a blocking function as an async tool that runs in _TOOL_POOL."""
+    def deco(fn):
+        # functools.wraps keeps fn's name, docstring and signature so the tool schema is unchanged
+        @function_tool(name)
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            async with get_tool_slots():
+                return await asyncio.get_running_loop().run_in_executor(_TOOL_POOL, functools.partial(fn, *args, **kwargs))
+        return wrapper
+    return deco
+
+# --- Tool Result Caches ---
+
+# Formatted tool results keyed by normalized input: {key: (expires_at, result)}.
+# Weather changes over minutes, news over a minute, prices within seconds, so each tool gets its own TTL.
+WEATHER_TTL = 600
+NEWS_TTL = 60
+CRYPTO_TTL = 30
+_WEATHER_CACHE: dict[str, tuple[float, str]] = {}
+_NEWS_CACHE: dict[tuple, tuple[float, str]] = {}
+_CRYPTO_CACHE: dict[str, tuple[float, str]] = {}
+
+def cache_get(cache, key):
+    """Returns the cached result for key if it hasn't expired, otherwise None."""
+    hit = cache.get(key)
+    if hit and hit[0] > time.monotonic():
+        return hit[1]
+    return None
+
+def cache_put(cache, key, ttl, result):
+    """Stores result under key for ttl seconds and returns it."""
+    cache[key] = (time.monotonic() + ttl, result)
+    return result
+
+# --- SMTP Connection Pool ---
+
+# Logged-in SMTP connections are kept in a small LIFO pool as (connection, last_used) pairs, so successive
+# emails skip the connect + STARTTLS + LOGIN handshake. A reaper thread closes connections idle too long.
+SMTP_POOL_SIZE = 4
+SMTP_IDLE_TIMEOUT = 60 # Seconds a pooled connection may sit unused before it's closed
+_SMTP_POOL: queue.LifoQueue = queue.LifoQueue(maxsize=SMTP_POOL_SIZE)
+
+def _close_conn(conn):
+    """Closes an SMTP connection, ignoring errors from an already-dead connection."""
+    import smtplib
+    try:
+        conn.quit()
+    except (smtplib.SMTPException, OSError):
+        conn.close()
+
+def _get_conn():
+    """Checks out a live pooled connection (verified with NOOP), or opens and logs in a new one."""
+    import smtplib
+    while True:
+        try:
+            conn, _ = _SMTP_POOL.get_nowait()
+        except queue.Empty:
+            break
+        try:
+            if conn.noop()[0] == 250:
+                return conn
+        except (smtplib.SMTPException, OSError):
+            pass
+        _close_conn(conn)
+    conn = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30)
+    conn.starttls() # Upgrade the connection to a secure encrypted one using TLS
+    conn.login(EMAIL_ADDRESS, EMAIL_PASSWORD) # Login to the SMTP server using credentials
+    return conn
+
+def _put_conn(conn):
+    """Returns a connection to the pool, closing it if the pool is already full."""
+    try:
+        _SMTP_POOL.put_nowait((conn, time.monotonic()))
+    except queue.Full:
+        _close_conn(conn)
+        return
+    _start_reaper()
+
+def _reap_idle_conns():
+    """Background loop that closes pooled connections idle for longer than SMTP_IDLE_TIMEOUT."""
+    while True:
+        time.sleep(SMTP_IDLE_TIMEOUT / 2)
+        cutoff = time.monotonic() - SMTP_IDLE_TIMEOUT
+        fresh = []
+        while True:
+            try:
+                conn, last_used = _SMTP_POOL.get_nowait()
+            except queue.Empty:
+                break
+            if last_used < cutoff:
+                _close_conn(conn)
+            else:
+                fresh.append((conn, last_used))
+        # Put the survivors back oldest first so the most recently used stays on top of the LIFO
+        for conn, last_used in reversed(fresh):
+            try:
+                _SMTP_POOL.put_nowait((conn, last_used))
+            except queue.Full:
+                _close_conn(conn)
+
+def _drain_smtp_pool():
+    """Closes every pooled connection (run at process exit so sessions are logged out cleanly)."""
+    while True:
+        try:
+            conn, _ = _SMTP_POOL.get_nowait()
+        except queue.Empty:
+            return
+        _close_conn(conn)
+
+# The reaper thread is started the first time a connection is pooled, so importing this module
+# (or running chats that never send email) doesn't start a background thread
+_reaper_started = False
+_reaper_lock = threading.Lock()
+
+def _start_reaper():
+    """Starts the idle-connection reaper thread once per process."""
+    global _reaper_started
+    if _reaper_started:
+        return
+    with _reaper_lock:
+        if not _reaper_started:
+            threading.Thread(target=_reap_idle_conns, name="smtp-reaper", daemon=True).start()
+            _reaper_started = True
+
+atexit.register(_drain_smtp_pool)
+
 # --- Tools Definition (Functions for each agent's task) ---
 
 # Tools are functions that agents can call to perform specific actions.
 # The @function_tool decorator registers the function as a callable tool for the agents.
+# Blocking tools use @async_tool instead, which registers them the same way but runs them in _TOOL_POOL.
+
+# Endpoints for the weather and crypto tools (query strings are passed as params, not built into the URL)
+WEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+FORECAST_URL = "https://api.openweathermap.org/data/2.5/forecast"
+FORECAST_STEPS = 8 # The forecast comes in 3-hour steps, so 8 steps cover the next 24 hours
+COINGECKO_PRICE_URL = "https://api.coingecko.com/api/v3/simple/price"
 
 # 1. Weather Tool: Fetches current weather data for a given city
 @function_tool("weather")
-def get_weather(city: str):
+async def get_weather(city: str):
     """
     Fetches current weather data for a specified city using the OpenWeatherMap API.
 
@@ -82,44 +305,103 @@ def get_weather(city: str):
     # Check if the OpenWeatherMap API key is available in environment variables
     if not WEATHER_API_KEY:
         return "Weather service is not configured. Please check the WEATHER_API_KEY environment variable."
+
+    # Return the cached result if this city was looked up recently
+    key = city.strip().lower()
+    cached = cache_get(_WEATHER_CACHE, key)
+    if cached is not None:
+        return cached
         
-    # Construct the API URL with the city and API key
-    url = f"https://api.openweathermap.org/data/2.5/weather?q={city}&appid={WEATHER_API_KEY}&units=metric" # units=metric for Celsius
+    # Query parameters for the API request; the HTTP client percent-encodes them (e.g. "São Paulo")
+    params = {
+        "q": city,
+        "appid": WEATHER_API_KEY,
+        "units": "metric" # units=metric for Celsius
+    }
     
-    # Make the HTTP GET request to the weather API
-    response = requests.get(url)
+    # Fetch current conditions and the next 24 hours of forecast concurrently (one round-trip of latency).
+    # The forecast is optional: if it fails, the current weather is still returned.
+    current, forecast = await asyncio.gather(
+        fetch_json(WEATHER_URL, params),
+        fetch_json(FORECAST_URL, {**params, "cnt": FORECAST_STEPS}),
+        return_exceptions=True
+    )
+    if isinstance(current, BaseException):
+        return f"Failed to get weather: {current}"
+    status, data = current
     
     # Process the API response based on status code
-    if response.status_code == 200: # Success
-        data = response.json()
+    if status == 200: # Success
         # Extract relevant weather information from the JSON response
         weather = data['weather'][0]['description']
         temp = data['main']['temp']
         humidity = data['main']['humidity']
         wind_speed = data['wind']['speed']
         
-        # Return formatted weather information as a multi-line string
-        return f"""Weather in {city}:
+        # Format weather information as a multi-line string
+        result = f"""Weather in {city}:
 • Temperature: {temp}°C
 • Conditions: {weather}
 • Humidity: {humidity}%
 • Wind Speed: {wind_speed} m/s"""
-    elif response.status_code == 401: # Unauthorized - likely an invalid API key
+        
+        # Add a summary of the next 24 hours when the forecast came back
+        if not isinstance(forecast, BaseException) and forecast[0] == 200 and forecast[1].get('list'):
+            steps = forecast[1]['list']
+            temps = [step['main']['temp'] for step in steps]
+            conditions = [step['weather'][0]['description'] for step in steps]
+            result += f"""
+Next 24 hours:
+• Low / High: {min(temps)}°C / {max(temps)}°C
+• Mostly: {max(set(conditions), key=conditions.count)}"""
+        
+        # Return the formatted weather (cached for WEATHER_TTL seconds)
+        return cache_put(_WEATHER_CACHE, key, WEATHER_TTL, result)
+    elif status == 401: # Unauthorized - likely an invalid API key
         return "Invalid weather API key."
-    elif response.status_code == 404: # Not Found - city not recognized by the API
+    elif status == 404: # Not Found - city not recognized by the API
         return f"City '{city}' not found."
     else:
         # Handle other potential API errors with their status code
-        return f"Failed to get weather. Status: {response.status_code}"
+        return f"Failed to get weather. Status: {status}"
 
-# 2. Email Tool: Sends an email to a specified recipient using SMTP
-@function_tool("send_email")
-def send_email(to_email: str, subject: str, message: str):
+# Sends one email to one recipient over a pooled connection (used by the send_email tool)
+def _send_one(to_email, subject, message):
+    import smtplib
+    from email.message import EmailMessage
+
+    # Create a single-part plain text email message (no multipart wrapper needed for a text-only body)
+    msg = EmailMessage()
+    msg['From'] = EMAIL_ADDRESS # Set the sender address
+    msg['To'] = to_email # Set the recipient address
+    msg['Subject'] = subject # Set the email subject
+    msg.set_content(message) # Set the plain text body of the email
+    
+    # Check out a logged-in connection from the pool and send the email.
+    # A connection that drops mid-send is discarded and the send is retried once on a fresh one.
+    for attempt in range(2):
+        server = _get_conn()
+        try:
+            server.send_message(msg) # Send the constructed email message
+        except smtplib.SMTPServerDisconnected:
+            _close_conn(server)
+            if attempt:
+                raise
+            continue
+        except Exception:
+            _close_conn(server) # Don't return a connection in an unknown state to the pool
+            raise
+        _put_conn(server) # Hand the connection back for the next email
+        return
+
+# 2. Email Tool: Sends an email to one or more recipients using SMTP
+@async_tool("send_email")
+def send_email(to_email: str | list[str], subject: str, message: str):
     """
     Sends an email using SMTP. Requires EMAIL_ADDRESS and EMAIL_PASSWORD environment variables.
 
     Args:
-        to_email: The recipient's email address.
+        to_email: The recipient's email address, or a list of addresses to send the same email to each.
         subject: The subject of the email.
         message: The plain text body of the email.
 
@@ -129,32 +411,38 @@ def send_email(to_email: str, subject: str, message: str):
     # Check if email sender credentials are set in environment variables
     if not EMAIL_ADDRESS or not EMAIL_PASSWORD:
         return "Email configuration is missing. Please set both EMAIL_ADDRESS and EMAIL_PASSWORD in your .env file."
-        
-    # Create the email message object using MIMEMultipart to handle different parts (like text)
-    msg = MIMEMultipart()
-    msg['From'] = EMAIL_ADDRESS # Set the sender address
-    msg['To'] = to_email # Set the recipient address
-    msg['Subject'] = subject # Set the email subject
-    
-    # Attach the plain text body to the email message
-    msg.attach(MIMEText(message, 'plain'))
-    
-    # Create an SMTP session and send the email within a 'with' statement
-    # This ensures the connection is properly closed afterwards.
-    with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-        
-        server.starttls()  # Upgrade the connection to a secure encrypted one using TLS
-        
-        server.login(EMAIL_ADDRESS, EMAIL_PASSWORD) # Login to the SMTP server using credentials
-        
-        server.send_message(msg) # Send the constructed email message
-        
-    # Return a success message if no exception occurred
-    return f"Email successfully sent to {to_email}!"
+
+    # A single recipient is sent directly; errors propagate to the agent as before
+    recipients = [to_email] if isinstance(to_email, str) else list(to_email)
+    if len(recipients) == 1:
+        _send_one(recipients[0], subject, message)
+        # Return a success message if no exception occurred
+        return f"Email successfully sent to {recipients[0]}!"
+
+    # Several recipients are sent in parallel, each worker drawing its own connection from the pool
+    import smtplib
+
+    def send(to):
+        try:
+            _send_one(to, subject, message)
+            return None
+        except (smtplib.SMTPException, OSError) as e:
+            return f"{to} ({e})"
+
+    with ThreadPoolExecutor(max_workers=min(8, len(recipients))) as pool:
+        failures = [failure for failure in pool.map(send, recipients) if failure]
+
+    sent = len(recipients) - len(failures)
+    if not failures:
+        return f"Email successfully sent to {sent} recipients!"
+    return f"Email sent to {sent} of {len(recipients)} recipients. Failed: " + ", ".join(failures)
+
+# Number of articles requested from the news API and included in the summary
+NEWS_LIMIT = 5
 
 # 3. News Tool: Fetches the latest news or news about a specific topic
 @function_tool("news")
-def get_news(query: str = None, category: str = None):
+async def get_news(query: str = None, category: str = None):
     """
     Fetches the latest news articles based on a query or category using the NewsData.io API.
 
@@ -166,13 +454,20 @@ def get_news(query: str = None, category: str = None):
         A formatted string containing a summary of recent news articles or a message
         indicating no articles were found or an error occurred.
     """
+    # Return the cached summary if the same query/category was fetched recently
+    key = ((query or "").strip().lower(), (category or "").strip().lower())
+    cached = cache_get(_NEWS_CACHE, key)
+    if cached is not None:
+        return cached
+
     # Base URL for the news API
     base_url = "https://newsdata.io/api/1/latest"
     
     # Parameters dictionary for the API request
     params = {
         "apikey": NEWS_API_KEY, # Include the API key
-        "language": "en" # Requesting news in English language
+        "language": "en", # Requesting news in English language
+        "size": NEWS_LIMIT # Only download as many articles as we show
     }
     
     # Add query and category to parameters if they were provided by the user
@@ -182,34 +477,43 @@ def get_news(query: str = None, category: str = None):
         params["category"] = category
     
     # Make the HTTP GET request to the news API with the specified parameters
-    response = requests.get(base_url, params=params)
+    status, data = await fetch_json(base_url, params) # Parsed JSON response body (None on failure)
     
     # Process the API response based on status code
-    if response.status_code == 200: # Success
-        data = response.json() # Parse the JSON response body
+    if status == 200: # Success
         articles = data.get("results", []) # Get the list of articles, default to an empty list if 'results' key is missing
         
         # Check if any articles were returned in the response
         if not articles:
             return "No news found." # Inform the user if no articles match the criteria
         
-        # Build a summary string of the top articles
-        news_summary = "Here are the latest news articles:\n\n"
-        # Iterate through the first 5 articles (or fewer if less than 5) and format the summary for each
-        for i, article in enumerate(articles[:5], 1): # enumerate adds a counter starting from 1
-            news_summary += f"{i}. {article['title']}\n" # Add article title
-            news_summary += f"   Source: {article['source_id']}\n" # Add article source
-            news_summary += f"   Description: {article.get('description', 'No description')}\n" # Add description, with a default if missing
-            news_summary += f"   Link: {article.get('link', 'No link')}\n\n" # Add link, with a default if missing
+        # Build a summary string of the top articles (parts are collected in a list and joined once)
+        parts = ["Here are the latest news articles:\n\n"]
+        # Iterate through the first NEWS_LIMIT articles (or fewer) and format the summary for each
+        for i, article in enumerate(articles[:NEWS_LIMIT], 1): # enumerate adds a counter starting from 1
+            parts.append(
+                f"{i}. {article['title']}\n" # Add article title
+                f"   Source: {article['source_id']}\n" # Add article source
+                f"   Description: {article.get('description', 'No description')}\n" # Add description, with a default if missing
+                f"   Link: {article.get('link', 'No link')}\n\n" # Add link, with a default if missing
+            )
+        news_summary = "".join(parts)
         
-        return news_summary # Return the formatted summary
+        return cache_put(_NEWS_CACHE, key, NEWS_TTL, news_summary) # Return (and cache) the formatted summary
     else:
         # Handle API errors with their status code
-        return f"News fetch failed. Status: {response.status_code}" # Inform the user about the failure and status code
+        return f"News fetch failed. Status: {status}" # Inform the user about the failure and status code
+
+# One translator per target language (source is auto-detected), created (and deep-translator imported) on first use and reused. Instances keep
+# per-request state, so each comes with a lock for when translations to the same language overlap.
+@functools.lru_cache(maxsize=32)
+def _translator(target_language: str):
+    from deep_translator import GoogleTranslator
+    return GoogleTranslator(source='auto', target=target_language), threading.Lock()
 
 # 4. Translate Tool: Translates text from one language to another
-@function_tool("translate_text")
-async def translate_text(text: str, target_language: str = "ur"):
+@async_tool("translate_text")
+def translate_text(text: str, target_language: str = "ur"):
     """
     Translates text to a target language using Google Translator via the deep-translator library.
 
@@ -220,20 +524,115 @@ async def translate_text(text: str, target_language: str = "ur"):
     Returns:
         A formatted string showing the original text and its translation, or an error message if translation fails.
     """
-    # Use deep-translator which is often more reliable for various languages than simple requests
-    translator = GoogleTranslator(source='auto', target=target_language) # Auto-detect source language
-    translation = translator.translate(text) # Perform the translation
+    # Use deep-translator which is often more reliable for various languages than simple requests.
+    # The translator for this language is reused; its lock serializes overlapping translations (this runs in _TOOL_POOL).
+    translator, lock = _translator(target_language)
+    with lock:
+        translation = translator.translate(text) # Perform the translation
     
     # Format the response string to show both original and translated text
     response = f"Original: {text}\nTranslation: {translation}"
     
     return response # Return the formatted translation result
 
+# Common ticker symbols mapped to their CoinGecko IDs (built once, not on every call)
+_CRYPTO_MAP = {
+    "btc": "bitcoin",
+    "eth": "ethereum",
+    "sol": "solana"
+}
+
+# Formats one coin's CoinGecko price data as the crypto tool's response
+def format_prices(crypto_id, price_data):
+    price_usd = price_data.get('usd', 0)
+    price_gbp = price_data.get('gbp', 0)
+    price_eur = price_data.get('eur', 0)
+    change_24h = price_data.get('usd_24h_change', 0)
+    return f"""Current {crypto_id.upper()} Prices:
+• USD: ${price_usd:,.2f}
+• GBP: £{price_gbp:,.2f}
+• EUR: €{price_eur:,.2f}
+24h Change: {change_24h:+.2f}%"""
+
+# When each coin's cached prices were fetched (monotonic clock), so replies can say how old they are
+_CRYPTO_FETCHED: dict[str, float] = {}
+
+def store_prices(crypto_id, price_data):
+    """Caches one coin's formatted prices for CRYPTO_TTL seconds and records when they were fetched."""
+    _CRYPTO_FETCHED[crypto_id] = time.monotonic()
+    cache_put(_CRYPTO_CACHE, crypto_id, CRYPTO_TTL, format_prices(crypto_id, price_data))
+
+def cached_prices(crypto_id):
+    """Returns the cached prices for crypto_id with their age, or None if they aren't cached (or expired)."""
+    cached = cache_get(_CRYPTO_CACHE, crypto_id)
+    if cached is None:
+        return None
+    age = time.monotonic() - _CRYPTO_FETCHED.get(crypto_id, time.monotonic())
+    return f"{cached}\n(Prices as of {age:.0f}s ago)"
+
+# The most-asked coins are refreshed in the background with one batched request, so their lookups are
+# answered from _CRYPTO_CACHE without waiting on the API. Refreshing before CRYPTO_TTL runs out keeps them warm.
+# The refresher only runs while these coins are being asked for: it starts on a lookup and stops once none
+# has come in for HOT_CRYPTO_IDLE seconds, so an idle app doesn't spend the API's rate limit.
+HOT_CRYPTO_IDS = ("bitcoin", "ethereum", "solana")
+HOT_CRYPTO_REFRESH = 20 # Seconds between refreshes (less than CRYPTO_TTL)
+HOT_CRYPTO_IDLE = 300 # Seconds without a hot coin lookup before the refresher stops
+HOT_CRYPTO_MAX_BACKOFF = 600 # Longest wait between refreshes while the API is rate limiting us
+_PRICE_REFRESHER = None
+_PRICES_READY = None # Set once the current refresher has finished its first round
+_last_hot_lookup = 0.0
+
+async def _refresh_hot_prices(ready):
+    """
+    Background loop that keeps HOT_CRYPTO_IDS prices in _CRYPTO_CACHE while they're being asked for.
+    Sets the ready event after the first round, so lookups waiting on it can read the cache.
+    """
+    params = {
+        "ids": ",".join(HOT_CRYPTO_IDS),
+        "vs_currencies": "usd,gbp,eur",
+        "include_24hr_change": "true"
+    }
+    interval = HOT_CRYPTO_REFRESH
+    # Runs outside any chat, so it has its own session on the shared connector
+    try:
+        async with aiohttp.ClientSession(timeout=HTTP_TIMEOUT, connector=get_connector(), connector_owner=False) as session:
+            while time.monotonic() - _last_hot_lookup < HOT_CRYPTO_IDLE:
+                try:
+                    # No retries: a failed refresh waits for the next round instead of adding requests
+                    status, data = await fetch_json(COINGECKO_PRICE_URL, params, session, retries=0)
+                    if status == 200:
+                        interval = HOT_CRYPTO_REFRESH
+                        for crypto_id in HOT_CRYPTO_IDS:
+                            if crypto_id in data:
+                                store_prices(crypto_id, data[crypto_id])
+                    elif status == 429:
+                        # Rate limited: back off so user-facing lookups keep the remaining quota
+                        interval = min(interval * 2, HOT_CRYPTO_MAX_BACKOFF)
+                except (aiohttp.ClientError, asyncio.TimeoutError, orjson.JSONDecodeError):
+                    pass # A missed refresh just means the next lookup goes to the API
+                ready.set()
+                await asyncio.sleep(interval)
+    finally:
+        ready.set() # Never leave a lookup waiting on a refresher that has stopped
+
+def note_hot_lookup():
+    """
+    Records a lookup of a hot coin and starts the refresher if it isn't running (needs a running loop).
+    Returns the event that is set once the refresher's first round is done.
+    """
+    global _PRICE_REFRESHER, _PRICES_READY, _last_hot_lookup
+    _last_hot_lookup = time.monotonic()
+    if _PRICE_REFRESHER is None or _PRICE_REFRESHER.done():
+        _PRICES_READY = asyncio.Event()
+        _PRICE_REFRESHER = asyncio.create_task(_refresh_hot_prices(_PRICES_READY))
+    return _PRICES_READY
+
 # 5. Cryptocurrency Tool: Fetches current cryptocurrency prices using CoinGecko API
 @function_tool("crypto_price")
-def get_crypto_price(crypto: str = "bitcoin"):
+async def get_crypto_price(crypto: str = "bitcoin"):
     """
     Fetches current cryptocurrency price data using the CoinGecko API.
+    Prices for the HOT_CRYPTO_IDS coins are usually already cached by the background refresher while they're in demand.
 
     Args:
         crypto: The cryptocurrency name or symbol (e.g., "bitcoin", "solana", "btc", "sol").
@@ -243,51 +642,49 @@ def get_crypto_price(crypto: str = "bitcoin"):
         A formatted string containing the current price and other relevant information,
         or an error message if the API request fails.
     """
-    # Map common symbols to their CoinGecko IDs
-    crypto_map = {
-        "btc": "bitcoin",
-        "eth": "ethereum",
-        "sol": "solana",
-        "bitcoin": "bitcoin",
-        "ethereum": "ethereum",
-        "solana": "solana"
-    }
-    
-    # Convert input to lowercase and map to CoinGecko ID if it's a known symbol
+    # Convert input to lowercase and map to CoinGecko ID if it's a known symbol (names are already IDs)
     crypto = crypto.lower()
-    crypto_id = crypto_map.get(crypto, crypto)
+    crypto_id = _CRYPTO_MAP.get(crypto, crypto)
+
+    # Keep the most-asked coins warm while people are asking for them. If the refresher was just started, its
+    # first round is already fetching this coin, so wait for it rather than sending a second request.
+    if crypto_id in HOT_CRYPTO_IDS:
+        ready = note_hot_lookup()
+        if not ready.is_set():
+            try:
+                await asyncio.wait_for(ready.wait(), HTTP_TIMEOUT.total)
+            except asyncio.TimeoutError:
+                pass # Fall back to fetching it ourselves
+
+    # Return the cached prices (with their age) if this coin was looked up recently
+    cached = cached_prices(crypto_id)
+    if cached is not None:
+        return cached
     
-    # Construct the API URL with the cryptocurrency ID
-    url = f"https://api.coingecko.com/api/v3/simple/price?ids={crypto_id}&vs_currencies=usd,gbp,eur&include_24hr_change=true"
+    # Query parameters for the API request (the cryptocurrency ID is percent-encoded by the HTTP client)
+    params = {
+        "ids": crypto_id,
+        "vs_currencies": "usd,gbp,eur",
+        "include_24hr_change": "true"
+    }
     
     try:
         # Make the HTTP GET request to the CoinGecko API
-        response = requests.get(url)
+        status, data = await fetch_json(COINGECKO_PRICE_URL, params)
         
         # Process the API response based on status code
-        if response.status_code == 200:  # Success
-            data = response.json()
-            
+        if status == 200:  # Success
             # Check if we got data for the requested cryptocurrency
             if crypto_id in data:
-                price_data = data[crypto_id]
-                price_usd = price_data.get('usd', 0)
-                price_gbp = price_data.get('gbp', 0)
-                price_eur = price_data.get('eur', 0)
-                change_24h = price_data.get('usd_24h_change', 0)
-                
-                # Format the response with prices in different currencies
-                return f"""Current {crypto_id.upper()} Prices:
-• USD: ${price_usd:,.2f}
-• GBP: £{price_gbp:,.2f}
-• EUR: €{price_eur:,.2f}
-24h Change: {change_24h:+.2f}%"""
+                # Format the response with prices in different currencies (cached for CRYPTO_TTL seconds)
+                store_prices(crypto_id, data[crypto_id])
+                return cached_prices(crypto_id)
             else:
                 return f"Could not find price data for {crypto}. Please check the cryptocurrency name or symbol."
-        elif response.status_code == 404:
+        elif status == 404:
             return f"Could not find cryptocurrency '{crypto}'. Please check the name or symbol and try again."
         else:
-            return f"Failed to get cryptocurrency price. Status: {response.status_code}"
+            return f"Failed to get cryptocurrency price. Status: {status}"
     except Exception as e:
         return f"Error retrieving cryptocurrency price: {str(e)}"
 
@@ -349,6 +746,53 @@ For other general questions, answer directly.
     tools=[get_weather, send_email, get_news, translate_text, get_crypto_price] # List all available tools that the main agent can potentially use or delegate to.
 )
 
+# Agent that handles each routed agent type; keyword-classified messages go straight to their specialist,
+# skipping the extra model call the main assistant would spend picking the tool.
+AGENTS = {
+    "Weather Agent": weather_agent,
+    "Email Agent": email_agent,
+    "Translator Agent": translator_agent,
+    "News Agent": news_agent,
+    "Crypto Agent": crypto_agent,
+    "General Assistant": main_agent
+}
+
+# A keyword can still show up in a message that isn't that specialist's task (e.g. "price" in a question about
+# house prices). Each specialist can hand such a message to the main assistant, which has every tool and
+# answers general questions, so a misrouted message costs one extra model call instead of a wrong answer.
+for agent in (weather_agent, email_agent, translator_agent, news_agent, crypto_agent):
+    agent.instructions += " If the request is not about this, hand it off to the Main Assistant."
+    agent.handoffs = [main_agent]
+
+# --- Message Routing ---
+
+# Keywords that pick the agent for a message, checked by one precompiled case-insensitive regex: each agent's
+# keywords form a named group and only match as whole words (so "sol" doesn't fire inside "solve", nor
+# "eth" inside "method"). When several agents match, the one listed first wins, as with the old if/elif chain.
+_AGENT_KEYWORDS = [
+    ("weather", "Weather Agent", ["weather", "temperature", "forecast"]),
+    ("email", "Email Agent", ["email", "send", "mail"]),
+    ("translator", "Translator Agent", ["translate", "translation"]),
+    ("news", "News Agent", ["news", "latest", "headlines"]),
+    ("crypto", "Crypto Agent", ["crypto", "bitcoin", "btc", "ethereum", "eth", "solana", "sol", "price"]),
+]
+_ROUTER_AGENTS = {tag: agent_type for tag, agent_type, _ in _AGENT_KEYWORDS}
+_ROUTER_RE = re.compile("|".join(
+    rf"(?P<{tag}>\b(?:{'|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))})\b)"
+    for tag, _, words in _AGENT_KEYWORDS
+), re.IGNORECASE)
+_ROUTER_PRIORITY = {tag: i for i, (tag, _, _) in enumerate(_AGENT_KEYWORDS)}
+
+def route_agent(text):
+    """Returns the agent type for a message: the highest-priority agent with a keyword in it, else General Assistant."""
+    tags = {match.lastgroup for match in _ROUTER_RE.finditer(text)}
+    if not tags:
+        return "General Assistant" # Default agent if no specific task keyword is detected
+    return _ROUTER_AGENTS[min(tags, key=_ROUTER_PRIORITY.__getitem__)]
+
+# Number of messages (user + assistant) kept in each session's history; older ones are dropped
+HISTORY_MAXLEN = 20
+
 # --- Chainlit Handlers (Chat Start and User Messages) ---
 
 # These functions are called by the Chainlit framework in response to user interactions.
@@ -357,7 +801,16 @@ For other general questions, answer directly.
 @cl.on_chat_start
 async def chat_start():
     # Initialize user message history for the current session. This history is used to provide context to the agent.
-    cl.user_session.set("history", [])
+    # It's capped at HISTORY_MAXLEN messages so per-session memory stays bounded.
+    cl.user_session.set("history", deque(maxlen=HISTORY_MAXLEN))
+    # Open the HTTP session shared by this chat's tool calls (pooled connections with cached DNS lookups)
+    cl.user_session.set("http", aiohttp.ClientSession(
+        timeout=HTTP_TIMEOUT,
+        connector=get_connector(),
+        connector_owner=False # The shared connector stays open when this chat's session closes
+    ))
+    # Cap how many of this chat's tool calls do I/O at once
+    cl.user_session.set("tool_slots", asyncio.Semaphore(TOOL_CONCURRENCY_LIMIT))
     # Define and send a welcome message to the user at the beginning of the chat.
     welcome_msg = """Welcome! I'm your AI Assistant. I can help you with:
 1. Checking the weather
@@ -369,6 +822,21 @@ async def chat_start():
 How can I help you today? 😊"""
     await cl.Message(content=welcome_msg).send() # Send the welcome message to the chat interface
 
+# Handles the end of a chat session: closes the session's HTTP connections.
+@cl.on_chat_end
+async def chat_end():
+    http = cl.user_session.get("http")
+    if http is not None:
+        await http.close()
+
+# Handles app shutdown: stops the price refresher and closes the shared HTTP connector.
+@cl.on_app_shutdown
+async def app_shutdown():
+    if _PRICE_REFRESHER is not None:
+        _PRICE_REFRESHER.cancel()
+    if _CONNECTOR is not None:
+        await _CONNECTOR.close()
+
 # Handles incoming messages from the user.
 @cl.on_message
 async def handle_message(message: cl.Message):
@@ -383,22 +851,9 @@ async def handle_message(message: cl.Message):
     # Add the current user message to the history list.
     history.append({"role": "user", "content": message.content})
 
-    # Analyze user input (converted to lowercase for case-insensitive matching) to determine the appropriate agent or task.
-    user_input = message.content.lower()
-    agent_type = "General Assistant" # Default agent if no specific task keyword is detected
-
     # Use keywords within the user input to decide which specialized agent should handle the query.
-    # This is a simple keyword-based routing mechanism.
-    if any(word in user_input for word in ["weather", "temperature", "forecast"]):
-        agent_type = "Weather Agent"
-    elif any(word in user_input for word in ["email", "send", "mail"]):
-        agent_type = "Email Agent"
-    elif any(word in user_input for word in ["translate", "translation"]):
-        agent_type = "Translator Agent"
-    elif any(word in user_input for word in ["news", "latest", "headlines"]):
-        agent_type = "News Agent"
-    elif any(word in user_input for word in ["crypto", "bitcoin", "btc", "ethereum", "eth", "solana", "sol", "price"]):
-        agent_type = "Crypto Agent"
+    # This is a simple keyword-based routing mechanism: one case-insensitive regex pass over the message.
+    agent_type = route_agent(message.content)
 
     # Send a message to the chat indicating which agent is processing the query.
     await cl.Message(
@@ -406,19 +861,17 @@ async def handle_message(message: cl.Message):
         author=agent_type # Set the author of the message to the agent name
     ).send()
 
-    # Run the main agent with the current message as input.
-    # The main agent's instructions and available tools will allow it to decide whether to handle the query itself
-    # or delegate to one of the specialized agents implicitly by calling the appropriate tool.
+    # Run the routed agent with the current message as input.
+    # Classified messages go directly to the specialized agent; anything else goes to the main agent, whose
+    # instructions and tools let it answer directly or call the appropriate tool.
     result = await Runner.run(
-        starting_agent=main_agent,
+        starting_agent=AGENTS[agent_type],
         input=[{"role": "user", "content": message.content}], # Pass the current message as a list of messages (context) to the agent
         run_config=config # Provide the model configuration for the runner
     )
 
-    # Store the assistant's final response (the output from the runner) in the history.
+    # Store the assistant's final response (the output from the runner) in the history (the deque is updated in place).
     history.append({"role": "assistant", "content": result.final_output})
-    # Update the session history stored in Chainlit.
-    cl.user_session.set("history", history)
 
     # Send the final result back to the user in the chat interface.
     await cl.Message(